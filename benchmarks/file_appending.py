@@ -0,0 +1,63 @@
+"""
+Compares the time taken to append many small chunks to a file by calling `append_bytes()` for each
+chunk to the time taken by `BatchedAppender`, which appends the chunks in batches.
+
+Usage:
+    python -m benchmarks.file_appending [--num-chunks 100000] [--chunk-sizes 16 256 4096]
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+from pathlib import Path
+
+from monkeytoolbox import BatchedAppender, append_bytes
+
+MIB = 1024 * 1024
+
+
+def append_chunks(file_path: Path, chunks: list[bytes]):
+    with open(file_path, "wb") as f:
+        for chunk in chunks:
+            append_bytes(f, chunk)
+
+
+def append_chunks_in_batches(file_path: Path, chunks: list[bytes]):
+    with open(file_path, "wb") as f, BatchedAppender(f) as appender:
+        for chunk in chunks:
+            appender.append(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--num-chunks", type=int, default=100_000)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[16, 256, 4096])
+    args = parser.parse_args()
+
+    print(f"Time to append {args.num_chunks} chunks to a file (best of 5)")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = Path(temp_dir) / "appended_file"
+
+        for chunk_size in args.chunk_sizes:
+            chunks = [os.urandom(chunk_size) for _ in range(args.num_chunks)]
+            size_mib = chunk_size * args.num_chunks / MIB
+
+            append_bytes_time = min(
+                timeit.repeat(lambda: append_chunks(file_path, chunks), number=1, repeat=5)
+            )
+            batched_time = min(
+                timeit.repeat(
+                    lambda: append_chunks_in_batches(file_path, chunks), number=1, repeat=5
+                )
+            )
+            print(
+                f"chunk={chunk_size:>5}B  "
+                f"append_bytes={size_mib / append_bytes_time:>7.1f}MiB/s  "
+                f"BatchedAppender={size_mib / batched_time:>7.1f}MiB/s  "
+                f"speedup={append_bytes_time / batched_time:>5.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares the time taken to hash files of different sizes by reading a new `bytes` object for each
+block (the original `get_binary_io_sha256_hash()` implementation) to the current implementation,
+which reads into a single reusable buffer.
+
+Usage:
+    python -m benchmarks.file_hashing [--sizes-mib 1 16 256] [--block-sizes-kib 64 256 1024]
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import timeit
+from pathlib import Path
+from typing import BinaryIO
+
+from monkeytoolbox import get_binary_io_sha256_hash
+from monkeytoolbox.file_utils import MAX_BLOCK_SIZE
+
+MIB = 1024 * 1024
+
+
+def read_blocks_sha256_hash(binary: BinaryIO, block_size: int) -> str:
+    sha256 = hashlib.sha256()
+    for block in iter(lambda: binary.read(block_size), b""):
+        sha256.update(block)
+
+    return sha256.hexdigest()
+
+
+def time_hash(file_path: Path, hash_fn, block_size: int) -> float:
+    def hash_file():
+        with open(file_path, "rb") as f:
+            hash_fn(f, block_size)
+
+    return min(timeit.repeat(hash_file, number=1, repeat=5))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes-mib", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument(
+        "--block-sizes-kib", type=int, nargs="+", default=[MAX_BLOCK_SIZE // 1024, 256, 1024]
+    )
+    args = parser.parse_args()
+
+    print("Time to hash a file that is in the page cache (best of 5)")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size_mib in args.sizes_mib:
+            file_path = Path(temp_dir) / f"{size_mib}MiB"
+            with open(file_path, "wb") as f:
+                for _ in range(size_mib):
+                    f.write(os.urandom(MIB))
+
+            for block_size_kib in args.block_sizes_kib:
+                block_size = block_size_kib * 1024
+                read_time = time_hash(file_path, read_blocks_sha256_hash, block_size)
+                readinto_time = time_hash(file_path, get_binary_io_sha256_hash, block_size)
+                print(
+                    f"size={size_mib:>5}MiB block={block_size_kib:>5}KiB  "
+                    f"read={size_mib / read_time:>7.1f}MiB/s  "
+                    f"readinto={size_mib / readinto_time:>7.1f}MiB/s"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares the time taken to calculate several hashes of a file with `get_binary_io_hashes()`, when
+the hashes are updated sequentially and when each hash is updated by its own thread.
+
+The parallel hashes can only be faster if at least as many CPUs as hashes are available.
+
+Usage:
+    python -m benchmarks.file_multi_hashing [--size-mib 256] [--block-sizes-kib 64 256 1024]
+        [--algorithms sha256 sha1 md5]
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+from pathlib import Path
+
+from monkeytoolbox import get_binary_io_hashes
+from monkeytoolbox.file_utils import MAX_BLOCK_SIZE
+
+MIB = 1024 * 1024
+
+
+def time_hashes(file_path: Path, algorithms: list[str], block_size: int, parallel: bool) -> float:
+    def hash_file():
+        with open(file_path, "rb") as f:
+            get_binary_io_hashes(f, algorithms, block_size, parallel=parallel)
+
+    return min(timeit.repeat(hash_file, number=1, repeat=5))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mib", type=int, default=256)
+    parser.add_argument(
+        "--block-sizes-kib", type=int, nargs="+", default=[MAX_BLOCK_SIZE // 1024, 256, 1024]
+    )
+    parser.add_argument("--algorithms", nargs="+", default=["sha256", "sha1", "md5"])
+    args = parser.parse_args()
+
+    print(
+        f"Time to calculate {', '.join(args.algorithms)} hashes of a {args.size_mib}MiB file that "
+        f"is in the page cache with {os.cpu_count()} CPUs (best of 5)"
+    )
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = Path(temp_dir) / f"{args.size_mib}MiB"
+        with open(file_path, "wb") as f:
+            for _ in range(args.size_mib):
+                f.write(os.urandom(MIB))
+
+        for block_size_kib in args.block_sizes_kib:
+            block_size = block_size_kib * 1024
+            sequential_time = time_hashes(file_path, args.algorithms, block_size, parallel=False)
+            parallel_time = time_hashes(file_path, args.algorithms, block_size, parallel=True)
+            print(
+                f"block={block_size_kib:>5}KiB  "
+                f"sequential={sequential_time:>6.3f}s  "
+                f"parallel={parallel_time:>6.3f}s  "
+                f"speedup={sequential_time / parallel_time:>5.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
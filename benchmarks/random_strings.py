@@ -0,0 +1,43 @@
+"""
+Compares the time taken to generate secure random strings with `secrets.SystemRandom().choices()`
+(the original `secure_generate_random_string()` implementation) to the buffered implementation.
+
+Usage:
+    python -m benchmarks.random_strings [--count 10000]
+"""
+
+import argparse
+import secrets
+import string
+import timeit
+
+from monkeytoolbox import secure_generate_random_string, secure_generate_random_strings
+
+CHARACTER_SET = string.ascii_letters + string.digits
+
+
+def system_random_choices(n: int) -> str:
+    return "".join(secrets.SystemRandom().choices(CHARACTER_SET, k=n))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=10000, help="Strings per run")
+    args = parser.parse_args()
+
+    print(f"Time to generate {args.count} strings (best of 5)")
+    for n in (8, 32, 128):
+        results = {
+            "choices": lambda: [system_random_choices(n) for _ in range(args.count)],
+            "buffered": lambda: [secure_generate_random_string(n) for _ in range(args.count)],
+            "bulk": lambda: secure_generate_random_strings(args.count, n),
+        }
+        timings = "  ".join(
+            f"{name}={min(timeit.repeat(fn, number=1, repeat=5)) * 1e3:>8.2f}ms"
+            for name, fn in results.items()
+        )
+        print(f"n={n:<4} {timings}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Measures the throughput and tail latency of `request_cache` when many threads call the same cached
+function, and compares it to a reference implementation that holds a single lock on every call (the
+original `request_cache` implementation).
+
+Usage:
+    python -m benchmarks.request_cache_contention [--threads 64] [--calls 20000]
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from functools import wraps
+from collections.abc import Callable
+
+from eggtimer import EggTimer
+
+from monkeytoolbox import request_cache
+
+TTL = 0.05
+REFRESH_LATENCY = 0.01
+
+
+def locked_request_cache(ttl: float):
+    def decorator(fn: Callable) -> Callable:
+        cached_value = None
+        timer = EggTimer()
+        lock = threading.Lock()
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            nonlocal cached_value
+
+            with lock:
+                if timer.is_expired():
+                    cached_value = fn(*args, **kwargs)
+                    timer.set(ttl)
+
+            return cached_value
+
+        return wrapper
+
+    return decorator
+
+
+def slow_request():
+    time.sleep(REFRESH_LATENCY)
+    return time.monotonic()
+
+
+def run(cached_fn: Callable, num_threads: int, calls_per_thread: int) -> tuple[float, list[float]]:
+    latencies: list[list[float]] = [[] for _ in range(num_threads)]
+    barrier = threading.Barrier(num_threads + 1)
+
+    def worker(thread_latencies: list[float]):
+        barrier.wait()
+        for _ in range(calls_per_thread):
+            start = time.perf_counter()
+            cached_fn()
+            thread_latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(lat,)) for lat in latencies]
+    for t in threads:
+        t.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    return elapsed, [latency for thread_latencies in latencies for latency in thread_latencies]
+
+
+def report(name: str, elapsed: float, latencies: list[float]):
+    quantiles = statistics.quantiles(latencies, n=1000)
+    print(
+        f"{name:>10}: {len(latencies) / elapsed:>12,.0f} calls/s  "
+        f"p50={quantiles[499] * 1e6:>9.1f}us  "
+        f"p99={quantiles[989] * 1e6:>9.1f}us  "
+        f"p99.9={quantiles[998] * 1e6:>9.1f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--calls", type=int, default=20000, help="Calls per thread")
+    args = parser.parse_args()
+
+    print(
+        f"{args.threads} threads x {args.calls} calls, ttl={TTL}s, "
+        f"refresh latency={REFRESH_LATENCY}s"
+    )
+    for name, decorator in (
+        ("locked", locked_request_cache(TTL)),
+        ("lock-free", request_cache(TTL)),
+    ):
+        report(name, *run(decorator(slow_request), args.threads, args.calls))
+
+
+if __name__ == "__main__":
+    main()
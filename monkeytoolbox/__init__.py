@@ -1,21 +1,52 @@
 from .environment import get_hardware_id, get_hostname, get_os, get_os_version
-from .decorators import request_cache
+from .decorators import request_cache, RequestCacheInfo
 from .code_utils import (
     apply_filters,
+    apply_vectorized_filters,
     queue_to_list,
+    drain_queue,
+    iter_queue_batches,
     del_key,
     insecure_generate_random_string,
+    insecure_generate_unique_random_strings,
     secure_generate_random_string,
+    secure_generate_random_strings,
+    SecureRandomStringGenerator,
     PeriodicCaller,
 )
+from .scheduler import (
+    AsyncPeriodicCaller,
+    Backoff,
+    CallbackStatus,
+    OverrunPolicy,
+    PeriodicCallStats,
+    PeriodicScheduler,
+    Schedule,
+    ScheduledTask,
+    get_default_scheduler,
+)
 from .file_utils import (
     append_bytes,
+    append_binary_io,
+    BatchedAppender,
+    copy_binary_io,
     make_fileobj_copy,
+    make_spooled_fileobj_copy,
     InvalidPath,
     expand_path,
     get_text_file_contents,
+    iter_text_file_chunks,
+    iter_text_file_lines,
+    memory_map_file,
+    FileTooLargeError,
     get_all_regular_files_in_directory,
+    walk_regular_files,
+    SymlinkPolicy,
     get_binary_io_sha256_hash,
+    get_binary_io_hashes,
+    copy_binary_io_with_hashes,
+    get_file_sha256_hashes,
+    FileHashCache,
 )
 from .secure_directory import create_secure_directory
 from .secure_file import open_new_securely_permissioned_file
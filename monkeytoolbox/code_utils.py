@@ -1,25 +1,64 @@
+import hashlib
 import logging
+import os
 import queue
 import random
-import secrets
 import string
-from threading import Event, Thread
+import time
+import weakref
+from array import array
+from functools import lru_cache
+from itertools import islice
+from threading import Lock
 from typing import Any, MutableMapping, Optional, TypeVar
-from collections.abc import Iterable, Callable
+from collections.abc import Callable, Generator, Iterable, Iterator, Sequence
+
+from .scheduler import (
+    Backoff,
+    CallbackStatus,
+    OverrunPolicy,
+    PeriodicCallStats,
+    PeriodicScheduler,
+    Schedule,
+    ScheduledTask,
+    get_default_scheduler,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore [assignment]
 
 T = TypeVar("T")
 
 logger = logging.getLogger(__name__)
 
+_ADAPTIVE_FILTER_SAMPLE_SIZE = 100
+_ADAPTIVE_FILTER_RESAMPLE_INTERVAL = 10000
 
-def apply_filters(filters: Iterable[Callable[[T], bool]], iterable: Iterable[T]) -> Iterable[T]:
+
+def apply_filters(
+    filters: Iterable[Callable[[T], bool]], iterable: Iterable[T], *, adaptive: bool = False
+) -> Iterable[T]:
     """
     Applies multiple filters to an iterable
 
+    By default, the filters are applied in the order they are provided. If `adaptive` is True, the
+    cost and rejection rate of each filter are periodically sampled, and the filters are reordered
+    so that the filters that reject the most items for the least time are applied first. All
+    filters are applied to an item in a single pass, and no further filters are applied once an
+    item is rejected. Adaptive filtering is only appropriate if the filters are independent of one
+    another and have no side effects, since the order they are applied in is unspecified.
+
     :param filters: An iterable of filters to be applied to the iterable
     :param iterable: An iterable to be filtered
+    :param adaptive: Whether to reorder the filters based on their cost and rejection rate,
+                     defaults to False
     :return: A new iterable with the filters applied
     """
+    if adaptive:
+        return _apply_filters_adaptively(list(filters), iterable)
+
     filtered_iterable = iterable
     for f in filters:
         filtered_iterable = filter(f, filtered_iterable)
@@ -27,15 +66,202 @@ def apply_filters(filters: Iterable[Callable[[T], bool]], iterable: Iterable[T])
     return filtered_iterable
 
 
+def _apply_filters_adaptively(
+    filters: list[Callable[[T], bool]], iterable: Iterable[T]
+) -> Iterator[T]:
+    iterator = iter(iterable)
+
+    while True:
+        ordered_filters = yield from _sample_filters(filters, iterator)
+        if ordered_filters is None:
+            # The iterator was exhausted while sampling
+            return
+
+        filters = ordered_filters
+
+        num_items = 0
+        for item in islice(iterator, _ADAPTIVE_FILTER_RESAMPLE_INTERVAL):
+            num_items += 1
+            for f in filters:
+                if not f(item):
+                    break
+            else:
+                yield item
+
+        if num_items < _ADAPTIVE_FILTER_RESAMPLE_INTERVAL:
+            return
+
+
+def _sample_filters(
+    filters: list[Callable[[T], bool]], iterator: Iterator[T]
+) -> Generator[T, None, Optional[list[Callable[[T], bool]]]]:
+    """
+    Apply the filters to a sample of items, measuring each filter as it's applied
+
+    :return: The filters, ordered by the time each one spent per rejected item, or None if the
+             iterator was exhausted
+    """
+    time_spent = [0.0] * len(filters)
+    rejections = [0] * len(filters)
+
+    num_items = 0
+    for item in islice(iterator, _ADAPTIVE_FILTER_SAMPLE_SIZE):
+        num_items += 1
+        for i, f in enumerate(filters):
+            start = time.perf_counter()
+            passed = f(item)
+            time_spent[i] += time.perf_counter() - start
+
+            if not passed:
+                rejections[i] += 1
+                break
+        else:
+            yield item
+
+    if num_items < _ADAPTIVE_FILTER_SAMPLE_SIZE:
+        return None
+
+    # Filters that rejected nothing keep their relative order at the end, since sorting is stable
+    order = sorted(
+        range(len(filters)),
+        key=lambda i: time_spent[i] / rejections[i] if rejections[i] else float("inf"),
+    )
+    return [filters[i] for i in order]
+
+
+def apply_vectorized_filters(
+    filters: Iterable[Callable[[Any], Any]], batches: Iterable[Sequence[Any]]
+) -> Iterator[Sequence[Any]]:
+    """
+    Applies multiple filters to batches of items, such as arrays of IP addresses or ports
+
+    If NumPy is installed, each batch is converted to a NumPy array, each filter is called once with
+    the whole array and must return a boolean mask, and the masks are combined with a logical AND.
+    Once no items remain in a batch, no further filters are applied to it. If NumPy is not
+    installed, each filter is called once per item instead. The filters must therefore be written
+    so that they work on both arrays and individual items, for example by using comparison and
+    bitwise operators (`&`, `|`) instead of `and` and `or`. Conditions must not be negated with `~`
+    or `not`: `~` turns a single `True` or `False` into a nonzero (truthy) integer, and `not` can't
+    be applied to an array. Invert the comparison instead, such as `port >= 1024` rather than
+    `~(port < 1024)`, or use `^ True`.
+
+    Example:
+        ports = [range(0, 10000), range(10000, 20000), ...]
+        filters = [lambda port: port >= 1024, lambda port: (port % 2) == 0]
+        for filtered_ports in apply_vectorized_filters(filters, ports):
+            ...
+
+    :param filters: An iterable of filters to be applied to each batch
+    :param batches: An iterable of batches of items to be filtered
+    :return: An iterator of filtered batches. Batches with no items remaining are skipped. If NumPy
+             is installed, the filtered batches are NumPy arrays, otherwise they are lists.
+    """
+    filters = list(filters)
+    filter_batch = _filter_batch_with_masks if np is not None else _filter_batch_per_item
+
+    for batch in batches:
+        filtered_batch = filter_batch(filters, batch)
+        if len(filtered_batch) > 0:
+            yield filtered_batch
+
+
+def _filter_batch_with_masks(filters: list[Callable[[Any], Any]], batch: Sequence[Any]) -> Any:
+    array = np.asarray(batch)
+    mask = np.ones(len(array), dtype=bool)
+
+    for f in filters:
+        if not mask.any():
+            break
+
+        mask &= np.asarray(f(array), dtype=bool)
+
+    return array[mask]
+
+
+def _filter_batch_per_item(filters: list[Callable[[Any], Any]], batch: Sequence[Any]) -> list[Any]:
+    return [item for item in batch if all(f(item) for f in filters)]
+
+
 def queue_to_list(q: queue.Queue) -> list[Any]:
-    list_ = []
+    return drain_queue(q)
+
+
+def drain_queue(
+    q: queue.Queue, max_items: Optional[int] = None, linger: Optional[float] = 0
+) -> list[Any]:
+    """
+    Remove a batch of items from a queue
+
+    Waits up to `linger` seconds for the queue to contain at least one item, then removes up to
+    `max_items` items that are in the queue. All of the items are removed while acquiring the
+    queue's lock only once.
+
+    :param q: The queue to remove items from
+    :param max_items: The maximum number of items to remove. If None (default), all items in the
+                      queue are removed.
+    :param linger: The maximum number of seconds to wait for the first item. If 0 (default), this
+                   function does not wait. If None, this function blocks until an item is available.
+    :return: A list of the removed items, in the order they were removed from the queue, which is
+             empty if no item became available within `linger` seconds
+    """
+    if not hasattr(q, "not_empty"):
+        # Other queues, such as multiprocessing.Queue and queue.SimpleQueue, don't expose their
+        # lock, so each item is removed separately
+        return _get_queue_items(q, max_items, linger)
+
+    # Queue.not_empty and Queue.not_full share the lock in Queue.mutex
+    with q.not_empty:
+        if linger is None or linger > 0:
+            q.not_empty.wait_for(q._qsize, timeout=linger)
+
+        num_items = q._qsize() if max_items is None else min(max_items, q._qsize())
+        items = [q._get() for _ in range(num_items)]
+
+        if items:
+            q.not_full.notify(len(items))
+
+    return items
+
+
+def _get_queue_items(
+    q: queue.Queue, max_items: Optional[int], linger: Optional[float]
+) -> list[Any]:
+    items: list[Any] = []
     try:
-        while True:
-            list_.append(q.get_nowait())
+        while max_items is None or len(items) < max_items:
+            if items or linger == 0:
+                items.append(q.get_nowait())
+            else:
+                items.append(q.get(timeout=linger))
     except queue.Empty:
         pass
 
-    return list_
+    return items
+
+
+def iter_queue_batches(
+    q: queue.Queue, max_items: Optional[int] = None, linger: Optional[float] = 0
+) -> Iterator[list[Any]]:
+    """
+    Remove batches of items from a queue until it remains empty
+
+    Each batch is removed as if by `drain_queue()`. Iteration stops once no item becomes
+    available within `linger` seconds.
+
+    Example:
+        while not stop.is_set():
+            for batch in iter_queue_batches(telemetry_queue, max_items=100, linger=0.5):
+                send_telemetry(batch)
+
+    :param q: The queue to remove items from
+    :param max_items: The maximum number of items in each batch. If None (default), each batch
+                      contains all items in the queue.
+    :param linger: The maximum number of seconds to wait for the first item of each batch,
+                   defaults to 0
+    :return: An iterator of non-empty lists of items
+    """
+    while batch := drain_queue(q, max_items, linger):
+        yield batch
 
 
 def del_key(mapping: MutableMapping[T, Any], key: T):
@@ -69,6 +295,97 @@ def insecure_generate_random_string(
     return _generate_random_string(random.choices, n, character_set)  # noqa: DUO102
 
 
+def insecure_generate_unique_random_strings(
+    n: int, character_set: str = string.ascii_letters + string.digits, seed: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Generate unique random strings
+
+    This function generates random strings of the length specified by the user, and guarantees that
+    no string is generated twice. The character set can optionally be specified by the user. Each
+    string is generated by applying a pseudorandom permutation to a counter, so no memory is needed
+    to keep track of the strings that have already been generated. Once every possible string has
+    been generated, the iterator is exhausted.
+
+    WARNING: This function is not safe to use for cryptographic purposes.
+
+    :param n: The desired number of characters in each random string
+    :param character set: The set of characters that may be included in the random strings,
+                          defaults to alphanumerics
+    :param seed: If set, the same sequence of strings is generated each time this function is called
+                 with the same arguments, defaults to None
+    :return: An iterator of unique random strings
+    :raises ValueError: If `n` is negative or `character_set` is empty
+    """
+    if n < 0:
+        raise ValueError("The length of the strings must not be negative")
+
+    # Duplicate characters would cause duplicate strings
+    character_set = "".join(dict.fromkeys(character_set))
+    if not character_set:
+        raise ValueError("The character set must not be empty")
+
+    num_strings = len(character_set) ** n
+    permutation = _FeistelPermutation(num_strings, random.Random(seed))  # noqa: DUO102
+
+    # The arguments are validated above, when this function is called, rather than when the
+    # returned generator is first advanced
+    return _generate_unique_random_strings(permutation, num_strings, n, character_set)
+
+
+def _generate_unique_random_strings(
+    permutation: "_FeistelPermutation", num_strings: int, n: int, character_set: str
+) -> Iterator[str]:
+    for i in range(num_strings):
+        yield _int_to_string(permutation(i), n, character_set)
+
+
+def _int_to_string(value: int, n: int, character_set: str) -> str:
+    num_chars = len(character_set)
+    chars = []
+    for _ in range(n):
+        value, index = divmod(value, num_chars)
+        chars.append(character_set[index])
+
+    return "".join(chars)
+
+
+class _FeistelPermutation:
+    """
+    A pseudorandom permutation of `range(size)`
+
+    A Feistel network is a permutation of the integers that can be represented with an even number
+    of bits. "Cycle walking" (repeatedly applying the network until the result is less than `size`)
+    restricts it to a permutation of `range(size)`.
+    """
+
+    _NUM_ROUNDS = 4
+
+    def __init__(self, size: int, rng: random.Random):  # noqa: DUO102
+        self._size = size
+        self._half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self._half_bytes = (self._half_bits + 7) // 8
+        self._half_mask = (1 << self._half_bits) - 1
+        self._round_keys = [rng.randbytes(16) for _ in range(self._NUM_ROUNDS)]
+
+    def __call__(self, value: int) -> int:
+        while True:
+            value = self._permute(value)
+            if value < self._size:
+                return value
+
+    def _permute(self, value: int) -> int:
+        left, right = value >> self._half_bits, value & self._half_mask
+        for key in self._round_keys:
+            left, right = right, left ^ self._round(key, right)
+
+        return (left << self._half_bits) | right
+
+    def _round(self, key: bytes, value: int) -> int:
+        digest = hashlib.shake_128(key + value.to_bytes(self._half_bytes, "little"))
+        return int.from_bytes(digest.digest(self._half_bytes), "little") & self._half_mask
+
+
 def secure_generate_random_string(
     n: int, character_set: str = string.ascii_letters + string.digits
 ) -> str:
@@ -86,7 +403,33 @@ def secure_generate_random_string(
     :param character set: The set of characters that may be included in the random string, defaults
                           to alphanumerics
     """
-    return _generate_random_string(secrets.SystemRandom().choices, n, character_set)
+    return _get_secure_random_string_generator(character_set).generate(n)
+
+
+def secure_generate_random_strings(
+    count: int, n: int, character_set: str = string.ascii_letters + string.digits
+) -> list[str]:
+    """
+    Generate multiple random strings
+
+    This function is equivalent to calling `secure_generate_random_string()` `count` times, but is
+    faster.
+
+    This function is safe to use for cryptographic purposes.
+
+    WARNING: This function may block if the system does not have sufficient entropy.
+
+    :param count: The desired number of random strings
+    :param n: The desired number of characters in each random string
+    :param character set: The set of characters that may be included in the random strings,
+                          defaults to alphanumerics
+    """
+    return _get_secure_random_string_generator(character_set).generate_many(count, n)
+
+
+@lru_cache(maxsize=16)
+def _get_secure_random_string_generator(character_set: str) -> "SecureRandomStringGenerator":
+    return SecureRandomStringGenerator(character_set)
 
 
 # Note: Trying to typehint the rng parameter is more trouble than it's worth
@@ -94,30 +437,216 @@ def _generate_random_string(rng, n: int, character_set: str) -> str:
     return "".join(rng(character_set, k=n))
 
 
+_secure_random_string_generators: "weakref.WeakSet[SecureRandomStringGenerator]" = weakref.WeakSet()
+
+
+class SecureRandomStringGenerator:
+    """
+    Generates cryptographically secure random strings
+
+    Random bytes are read from `os.urandom()` in large blocks and converted to characters in bulk,
+    which is much faster than generating each character separately. Each character in the character
+    set is equally likely, since any random bytes that would bias the result are discarded. Buffered
+    characters are discarded in a child process after a fork, so that the parent and child never
+    generate the same strings.
+
+    This class is thread-safe.
+    """
+
+    def __init__(
+        self, character_set: str = string.ascii_letters + string.digits, block_size: int = 4096
+    ):
+        """
+        :param character_set: The set of characters that may be included in the random strings,
+                              defaults to alphanumerics
+        :param block_size: The minimum number of bytes to read from `os.urandom()` at a time,
+                           defaults to 4096
+        :raises ValueError: If `character_set` is empty
+        """
+        if not character_set:
+            raise ValueError("The character set must not be empty")
+
+        self._character_set = character_set
+        self._block_size = block_size
+
+        self._lock = Lock()
+        self._buffer = ""
+        self._position = 0
+
+        if len(character_set) <= 256:
+            self._init_byte_mapping()
+        else:
+            self._init_word_mapping()
+
+        _secure_random_string_generators.add(self)
+
+    def _init_byte_mapping(self):
+        num_chars = len(self._character_set)
+        # Bytes >= limit are discarded, otherwise characters at the start of the character set
+        # would be more likely than characters at the end
+        limit = 256 - (256 % num_chars)
+        self._acceptance_rate = limit / 256
+        self._rejected_bytes = bytes(range(limit, 256))
+
+        if all(ord(c) < 256 for c in self._character_set):
+            self._byte_table = bytes(ord(self._character_set[b % num_chars]) for b in range(256))
+            self._char_table = None
+        else:
+            self._byte_table = bytes(b % num_chars for b in range(256))
+            self._char_table = dict(enumerate(self._character_set))
+
+        self._convert = self._convert_bytes
+
+    def _init_word_mapping(self):
+        num_chars = len(self._character_set)
+        self._limit = 65536 - (65536 % num_chars)
+        self._acceptance_rate = self._limit / 65536
+
+        self._convert = self._convert_words
+
+    def generate(self, n: int) -> str:
+        """
+        Generate a random string
+
+        :param n: The desired number of characters in the random string
+        """
+        with self._lock:
+            return self._take(n)
+
+    def generate_many(self, count: int, n: int) -> list[str]:
+        """
+        Generate multiple random strings
+
+        :param count: The desired number of random strings
+        :param n: The desired number of characters in each random string
+        """
+        with self._lock:
+            chars = self._take(count * n)
+
+        return [chars[i * n : (i + 1) * n] for i in range(count)]
+
+    def _take(self, n: int) -> str:
+        if n <= 0:
+            return ""
+
+        while len(self._buffer) - self._position < n:
+            self._fill(n - (len(self._buffer) - self._position))
+
+        chars = self._buffer[self._position : self._position + n]
+        self._position += n
+
+        return chars
+
+    def _fill(self, num_chars: int):
+        # Read enough random bytes that at least `num_chars` characters are likely to be accepted
+        num_bytes = max(self._block_size, int(num_chars / self._acceptance_rate * 1.1) + 16)
+        self._buffer = self._buffer[self._position :] + self._convert(os.urandom(num_bytes))
+        self._position = 0
+
+    def _convert_bytes(self, random_bytes: bytes) -> str:
+        chars = random_bytes.translate(self._byte_table, self._rejected_bytes).decode("latin-1")
+        if self._char_table is not None:
+            chars = chars.translate(self._char_table)
+
+        return chars
+
+    def _convert_words(self, random_bytes: bytes) -> str:
+        words = array("H", random_bytes[: len(random_bytes) // 2 * 2])
+        num_chars = len(self._character_set)
+
+        return "".join(self._character_set[w % num_chars] for w in words if w < self._limit)
+
+    def _discard_buffer(self):
+        self._buffer = ""
+        self._position = 0
+        # The lock may have been held by another thread at the time of the fork
+        self._lock = Lock()
+
+
+def _discard_secure_random_string_buffers():
+    for generator in _secure_random_string_generators:
+        generator._discard_buffer()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_discard_secure_random_string_buffers)
+
+
 class PeriodicCaller:
     """
     Periodically calls a function
 
     Given a callable and a period, this component calls the callback periodically. The calls can
     occur in the background by calling the `start()` method, or in the foreground by calling the
-    `run()` method. Note that this component is susceptible to "timer creep". In other words, the
+    `run()` method. By default, this component is susceptible to "timer creep". In other words, the
     callable is not called every `period` seconds. It is called `period` seconds after the last call
     completes. This prevents multiple calls to the callback occurring concurrently.
+
+    If `fixed_rate` is True, the callable is instead called every `period` seconds, as measured from
+    the first call, regardless of how long each call takes. Calls still never occur concurrently;
+    if a call takes longer than the period, `overrun_policy` determines what happens to the calls
+    that were missed.
+
+    Random jitter can be added to the time between calls, which prevents many processes that were
+    started at the same time from calling their callbacks at the same time. Jitter does not
+    accumulate when `fixed_rate` is True.
+
+    Background calls are made by a `PeriodicScheduler`, which is shared by all `PeriodicCaller`s
+    unless one is provided, so that many `PeriodicCaller`s don't require many threads.
+
+    Statistics about the calls, such as how long they take and how late they start, can be read
+    with `stats()`. If `stats_hook` is set, it is called with the latest `PeriodicCallStats` after
+    each call, which can be used to publish metrics.
+
+    If `backoff` is set, calls are delayed exponentially while the callback fails, either by
+    raising an exception or by returning `CallbackStatus.BUSY`. Calling `trigger()` makes the
+    callback be called as soon as possible, for example when new data is available.
     """
 
-    def __init__(self, callback: Callable[[], None], period: float, name: Optional[str] = None):
+    def __init__(
+        self,
+        callback: Callable[[], Optional[CallbackStatus]],
+        period: float,
+        name: Optional[str] = None,
+        *,
+        fixed_rate: bool = False,
+        overrun_policy: OverrunPolicy = OverrunPolicy.SKIP,
+        jitter: float = 0,
+        backoff: Optional[Backoff] = None,
+        scheduler: Optional[PeriodicScheduler] = None,
+        stats_hook: Optional[Callable[[PeriodicCallStats], None]] = None,
+    ):
         """
         :param callback: A callable to be called periodically
         :param period: The time to wait between calls of `callback`.
         :param name: A human-readable name for this caller that will be used in debug logging
+        :param fixed_rate: Whether to call `callback` every `period` seconds rather than waiting
+                           `period` seconds after each call completes, defaults to False
+        :param overrun_policy: What to do with calls that are missed because a call took longer
+                               than `period`. Only used if `fixed_rate` is True. Defaults to
+                               `OverrunPolicy.SKIP`.
+        :param jitter: The maximum number of seconds of random delay to add before each call,
+                       defaults to 0
+        :param backoff: How to delay calls after the callback fails, defaults to None
+        :param scheduler: The `PeriodicScheduler` that makes background calls, defaults to the
+                          scheduler returned by `get_default_scheduler()`
+        :param stats_hook: A callable that is passed this component's statistics after each call,
+                           defaults to None
         """
         self._callback = callback
-        self._period = period
+        self._schedule = Schedule(
+            period,
+            fixed_rate=fixed_rate,
+            overrun_policy=overrun_policy,
+            jitter=jitter,
+            backoff=backoff,
+        )
+        self._scheduler = scheduler
+        self._stats_hook = stats_hook
 
         self._name = f"PeriodicCaller-{callback.__name__}" if name is None else name
 
-        self._stop = Event()
-        self._thread: Optional[Thread] = None
+        self._task: Optional[ScheduledTask] = None
 
     def start(self):
         """
@@ -125,21 +654,45 @@ class PeriodicCaller:
         """
         logger.debug(f"Starting {self._name}")
 
-        self._stop.clear()
-        self._thread = Thread(daemon=True, name=self._name, target=self.run)
-        self._thread.start()
+        scheduler = get_default_scheduler() if self._scheduler is None else self._scheduler
+
+        self._task = scheduler.schedule(
+            self._callback, self._schedule, self._name, stats_hook=self._stats_hook
+        )
+
+        logger.debug(f"Successfully started {self._name}")
 
     def run(self):
         """
         Periodically call the callback and block until `stop()` is called
         """
+        self._task = ScheduledTask(
+            self._callback, self._schedule, self._name, stats_hook=self._stats_hook
+        )
+
         logger.debug(f"Successfully started {self._name}")
+        self._task.run()
+        logger.debug(f"Successfully stopped {self._name}")
 
-        while not self._stop.is_set():
-            self._callback()
-            self._stop.wait(self._period)
+    def trigger(self):
+        """
+        Call the callback as soon as possible rather than waiting for its next scheduled call
 
-        logger.debug(f"Successfully stopped {self._name}")
+        If the callback is currently being called, it is called again as soon as the call
+        completes. Any number of triggers before the callback is called result in a single call.
+        This method is thread-safe and does nothing if this component is not running.
+        """
+        if self._task is not None:
+            self._task.trigger()
+
+    def stats(self) -> PeriodicCallStats:
+        """
+        Get statistics about the calls made since `start()` or `run()` was last called
+        """
+        if self._task is None:
+            return PeriodicCallStats(0, 0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+        return self._task.stats()
 
     def stop(self, timeout: Optional[float] = None):
         """
@@ -152,10 +705,9 @@ class PeriodicCaller:
         """
         logger.debug(f"Stopping {self._name}")
 
-        self._stop.set()
-
-        if self._thread is not None:
-            self._thread.join(timeout=timeout)
-
-            if self._thread.is_alive():
+        if self._task is not None:
+            if not self._task.cancel(timeout=timeout):
                 logger.warning(f"Timed out waiting for {self._name} to stop")
+                return
+
+            logger.debug(f"Successfully stopped {self._name}")
@@ -1,12 +1,102 @@
+import asyncio
+import atexit
+import inspect
+import logging
+import os
+import pickle
+import re
+import stat
+import sys
 import threading
-from functools import wraps
-from typing import Any
+import time
+import weakref
+from contextlib import contextmanager
+from functools import partial, wraps
+from pathlib import Path
+from typing import Any, Hashable, NamedTuple, Optional
 from collections.abc import Callable
 
 from eggtimer import EggTimer
+from monkeytypes import OperatingSystem
 
+from . import get_os
+from .file_utils import write_file_atomically
+from .scheduler import Schedule, ScheduledTask, get_default_scheduler
+from .secure_directory import create_secure_directory
+from .threading import create_daemon_thread
 
-def request_cache(ttl: float):
+try:
+    if get_os() == OperatingSystem.WINDOWS:
+        from .windows_permissions import has_owner_only_permissions
+except RuntimeError:
+    # Importing `secure_directory` has already warned that this OS may not be supported
+    pass
+
+logger = logging.getLogger(__name__)
+
+# The minimum number of seconds between saves of a persisted cache's return values
+_PERSIST_INTERVAL = 1.0
+
+
+class _Sentinel:
+    # Sentinels are pickled by name so that persisted cache keys still match after being loaded
+    def __init__(self, name: str):
+        self._name = name
+
+    def __reduce__(self) -> str:
+        return self._name
+
+    def __repr__(self) -> str:
+        return self._name
+
+
+_UNKEYED = _Sentinel("_UNKEYED")
+_KWARGS_MARK = _Sentinel("_KWARGS_MARK")
+
+
+class RequestCacheInfo(NamedTuple):
+    """
+    Statistics about a function decorated with `request_cache()`
+
+    The counters are cumulative and are not reset when the cache is cleared. Hits are counted
+    without a lock, so they may be slightly undercounted if many threads hit the cache at once.
+    """
+
+    hits: int
+    """The number of calls that returned a cached return value, whether fresh or stale"""
+
+    misses: int
+    """The number of calls that had to wait for the decorated function to return"""
+
+    refreshes: int
+    """The number of background refreshes that were started"""
+
+    errors: int
+    """The number of times the decorated function raised an exception"""
+
+    currsize: int
+    """The number of cached return values"""
+
+    call_time: float
+    """The total number of seconds spent in the decorated function"""
+
+    lock_wait_time: float
+    """The total number of seconds spent waiting to acquire the cache's lock"""
+
+
+def request_cache(
+    ttl: float,
+    *,
+    keyed: bool = False,
+    maxsize: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    sizeof: Optional[Callable[[Any], int]] = None,
+    stale_while_revalidate: float = 0,
+    refresh_ahead: Optional[float] = None,
+    stats_hook: Optional[Callable[[RequestCacheInfo], None]] = None,
+    persist_dir: Optional[Path] = None,
+    persist_name: Optional[str] = None,
+):
     """
     This is a decorator that allows a single response of a function to be cached with an expiration
     time (TTL). The first call to the function is executed and the response is cached. Subsequent
@@ -33,35 +123,685 @@ def request_cache(ttl: float):
         assert status_1 == status_2
         assert status_1 != status_3
 
+    By default, the arguments passed to the decorated function are ignored and a single response is
+    cached. If `keyed` is True, one response is cached per unique set of arguments, each with its
+    own TTL. The number of cached responses can be bounded by `maxsize` and/or `max_bytes`, in
+    which case responses that have not been used recently are evicted first. All arguments must be
+    hashable.
+
+    Returning a cached response does not acquire any locks. If multiple threads call the decorated
+    function when no valid response is cached, only one of them calls the underlying function; the
+    others wait for and return its result (or raise its exception).
+
+    Coroutine functions are also supported, in which case the awaited return value is cached and
+    concurrent callers await a single shared call. All callers of a decorated coroutine function
+    must use the same event loop.
+
+    Statistics about the cache can be retrieved with `cache_info()`, which returns a
+    `RequestCacheInfo`. If `stats_hook` is set, it is called with the latest `RequestCacheInfo`
+    each time the decorated function returns or raises, which can be used to publish metrics.
+    Statistics are collected without adding any locks or timing to cache hits.
+
+    Example:
+        raining_outside()
+        raining_outside()
+
+        assert raining_outside.cache_info().hits == 1
+
+    If `persist_dir` is set, the cached return values are also saved to a file in that directory,
+    and are loaded when the function is decorated. Return values that have not expired therefore
+    survive a restart of the program. Changes are saved in the background about once per second,
+    so that calls aren't slowed down by writing to disk, as well as when the cache is cleared and
+    when the program exits. Expiration of persisted return values is based on wall-clock time. The
+    directory is created with secure permissions if necessary, and each decorated function's return
+    values are saved in a separate file, which is named after `persist_name` or, by default, the
+    function's qualified name. Functions that are defined inside another function can't be told
+    apart by their qualified names, so they must be given a `persist_name`. A persisted file is only
+    loaded if it is owned by the current user and can't be accessed by anyone else. All arguments
+    and return values must be picklable. Any errors that occur while creating the directory or
+    saving or loading return values are logged and otherwise ignored. If the directory can't be
+    created, return values are only cached in memory.
+
+    The latency of refreshing an expired response can be hidden from callers with
+    `stale_while_revalidate` and `refresh_ahead`. For `stale_while_revalidate` seconds after the
+    TTL elapses, the expired response continues to be returned while a background thread calls the
+    decorated function to refresh it. If `refresh_ahead` is set, the background refresh starts once
+    that fraction of the TTL has elapsed, before the response expires at all. If a background
+    refresh raises an exception, the exception is logged and the cached response is kept.
+
+    Example:
+        # Refresh in the background after 8 minutes and serve responses that are up to 1 minute
+        # out of date rather than blocking on a refresh
+        @request_cache(600, stale_while_revalidate=60, refresh_ahead=0.8)
+        def raining_outside():
+            return requests.get(f"https://weather.service.api/check_for_rain/{MY_ZIP_CODE}")
+
+    Example:
+        @request_cache(600, keyed=True, maxsize=256)
+        def raining_outside(zip_code: str):
+            return requests.get(f"https://weather.service.api/check_for_rain/{zip_code}")
+
     :param ttl: The time-to-live in seconds for the cached return value
+    :param keyed: Whether to cache a separate return value for each unique set of arguments,
+                  defaults to False
+    :param maxsize: The maximum number of cached return values. Only valid if `keyed` is True.
+                    If None (default), the number of cached return values is unbounded.
+    :param max_bytes: The maximum total size of the cached return values, as estimated by
+                      `sizeof`. Only valid if `keyed` is True. If None (default), the total size
+                      is unbounded.
+    :param sizeof: A callable that estimates the size in bytes of a return value. Only valid if
+                   `max_bytes` is set. Defaults to `sys.getsizeof()`.
+    :param stale_while_revalidate: The number of seconds after the TTL elapses during which the
+                                   expired return value is returned while it is refreshed in the
+                                   background, defaults to 0
+    :param refresh_ahead: The fraction of the TTL, greater than 0 and at most 1, after which the
+                          cached return value is refreshed in the background. If None (default),
+                          the return value is not refreshed before it expires.
+    :param stats_hook: A callable that is passed the cache's statistics each time the decorated
+                       function is called, defaults to None
+    :param persist_dir: A directory in which to persist the cached return values. If None
+                        (default), cached return values are only stored in memory.
+    :param persist_name: A name that uniquely identifies the persisted return values within
+                         `persist_dir`. Only valid if `persist_dir` is set. If None (default), the
+                         function's qualified name is used.
     :return: The return value of the decorated function, or the cached return value if the TTL has
              not elapsed.
+    :raises ValueError: If `maxsize`, `max_bytes`, `sizeof`, `stale_while_revalidate`,
+                        `refresh_ahead`, or `persist_name` are used incorrectly
     """
+    if not keyed and (maxsize is not None or max_bytes is not None):
+        raise ValueError("maxsize and max_bytes can only be used if keyed is True")
+
+    if sizeof is not None and max_bytes is None:
+        raise ValueError("sizeof can only be used if max_bytes is set")
+
+    if stale_while_revalidate < 0:
+        raise ValueError("stale_while_revalidate must not be negative")
+
+    if refresh_ahead is not None and not (0 < refresh_ahead <= 1):
+        raise ValueError("refresh_ahead must be greater than 0 and at most 1")
+
+    if persist_name is not None and persist_dir is None:
+        raise ValueError("persist_name can only be used if persist_dir is set")
+
+    cache_options = {
+        "keyed": keyed,
+        "maxsize": maxsize,
+        "max_bytes": max_bytes,
+        "sizeof": sizeof,
+        "stale_while_revalidate": stale_while_revalidate,
+        "refresh_ahead": refresh_ahead,
+        "stats_hook": stats_hook,
+        "persist_dir": persist_dir,
+    }
 
     def decorator(fn: Callable) -> Callable:
-        cached_value = None
+        name = None if persist_dir is None else _get_persist_name(fn, persist_name)
+
+        if inspect.iscoroutinefunction(fn):
+            return _decorate_coroutine_function(
+                fn, _AsyncRequestCache(fn, ttl, persist_name=name, **cache_options)
+            )
+
+        return _decorate_function(
+            fn, _SyncRequestCache(fn, ttl, persist_name=name, **cache_options)
+        )
+
+    return decorator
+
+
+def _decorate_function(fn: Callable, cache: "_SyncRequestCache") -> Callable:
+    @wraps(fn)
+    def wrapper(*args, **kwargs) -> Any:
+        return cache.get(args, kwargs)
+
+    wrapper.clear_cache = cache.clear  # type: ignore [attr-defined]
+    wrapper.cache_info = cache.cache_info  # type: ignore [attr-defined]
+
+    return wrapper
+
+
+def _decorate_coroutine_function(fn: Callable, cache: "_AsyncRequestCache") -> Callable:
+    @wraps(fn)
+    async def wrapper(*args, **kwargs) -> Any:
+        return await cache.get(args, kwargs)
+
+    wrapper.clear_cache = cache.clear  # type: ignore [attr-defined]
+    wrapper.cache_info = cache.cache_info  # type: ignore [attr-defined]
+
+    return wrapper
+
+
+def _getsizeof(value: Any) -> int:
+    return sys.getsizeof(value)
+
+
+def _get_persist_name(fn: Callable, persist_name: Optional[str]) -> str:
+    if persist_name is not None:
+        return persist_name
+
+    qualified_name = getattr(fn, "__qualname__", fn.__name__)
+    if "<locals>" in qualified_name:
+        raise ValueError(
+            f"persist_name must be set to persist the return values of {qualified_name}, since "
+            "functions defined inside another function can't be told apart by name"
+        )
+
+    return f"{fn.__module__}.{qualified_name}"
+
+
+def _get_persist_file_name(persist_name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", persist_name) + ".cache"
+
+
+def _check_persist_file_is_secure(path: Path, fd: int):
+    if get_os() == OperatingSystem.WINDOWS:
+        # A file that already existed when the directory was made secure keeps its own permissions
+        if not has_owner_only_permissions(str(path)):
+            raise PermissionError(
+                "The file is not owned by the current user or can be accessed by other users"
+            )
+
+        return
+
+    file_stat = os.fstat(fd)
+    if file_stat.st_uid != os.geteuid():
+        raise PermissionError("The file is not owned by the current user")
+
+    if stat.S_IMODE(file_stat.st_mode) & (stat.S_IRWXG | stat.S_IRWXO):
+        raise PermissionError("The file can be accessed by users other than its owner")
+
+
+class _CacheEntry:
+    __slots__ = ("value", "timer", "size", "referenced")
+
+    def __init__(self, value: Any, timer: EggTimer, size: int):
+        self.value = value
+        self.timer = timer
+        self.size = size
+        self.referenced = False
+
+
+class _RequestCache:
+    """
+    The cached entries that back `request_cache()`, and the policy for expiring and evicting them
+
+    Each entry's timer is set to the TTL plus the stale-while-revalidate window, so a single check
+    of the time remaining determines whether the entry is fresh, should be refreshed in the
+    background, or can't be used at all.
+
+    Entries are only ever mutated (and iterated over) by a single thread at a time, but are read
+    concurrently by cache hits. Since hits can't safely reorder `_entries`, eviction uses the
+    "second chance" approximation of LRU: a hit marks the entry as referenced, and a referenced
+    entry is moved to the back of the queue instead of being evicted.
+    """
+
+    def __init__(
+        self,
+        fn: Callable,
+        ttl: float,
+        *,
+        keyed: bool,
+        maxsize: Optional[int],
+        max_bytes: Optional[int],
+        sizeof: Optional[Callable[[Any], int]],
+        stale_while_revalidate: float,
+        refresh_ahead: Optional[float],
+        stats_hook: Optional[Callable[[RequestCacheInfo], None]],
+        persist_dir: Optional[Path],
+        persist_name: Optional[str],
+    ):
+        self._fn = fn
+        self._name = getattr(fn, "__qualname__", repr(fn))
+        self._ttl = ttl
+        self._stale_while_revalidate = stale_while_revalidate
+        self._keyed = keyed
+        self._maxsize = maxsize
+        self._max_bytes = max_bytes
+        self._sizeof = _getsizeof if sizeof is None else sizeof
+
+        # An entry with less than this much time remaining on its timer needs to be refreshed
+        self._refresh_threshold = stale_while_revalidate
+        if refresh_ahead is not None:
+            self._refresh_threshold += (1 - refresh_ahead) * ttl
+
+        self._entries: dict[Hashable, _CacheEntry] = {}
+        self._total_size = 0
+        self._generation = 0
+
+        self._stats_hook = stats_hook
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._errors = 0
+        self._call_time = 0.0
+        self._lock_wait_time = 0.0
+
+        self._persist_path: Optional[Path] = None
+        self._persist_lock = threading.Lock()
+        self._persist_task: Optional[ScheduledTask] = None
+        self._dirty = False
+        if persist_dir is not None:
+            assert persist_name is not None
+            self._enable_persistence(persist_dir, persist_name)
+
+    def __del__(self):
+        # The persist task may be running on this thread, so don't wait for it
+        if self._persist_task is not None:
+            self._persist_task.cancel(timeout=0)
+
+        self.persist()
+
+    def cache_info(self) -> RequestCacheInfo:
+        return RequestCacheInfo(
+            hits=self._hits,
+            misses=self._misses,
+            refreshes=self._refreshes,
+            errors=self._errors,
+            currsize=len(self._entries),
+            call_time=self._call_time,
+            lock_wait_time=self._lock_wait_time,
+        )
+
+    def _publish_stats(self):
+        if self._stats_hook is None:
+            return
+
+        try:
+            self._stats_hook(self.cache_info())
+        except Exception:
+            logger.exception(f"Failed to publish the request cache statistics of {self._name}")
+
+    def _make_key(self, args: tuple, kwargs: dict) -> Hashable:
+        if not self._keyed:
+            return _UNKEYED
+
+        if not kwargs:
+            return args
+
+        return args + (_KWARGS_MARK,) + tuple(sorted(kwargs.items()))
+
+    def _clear(self):
+        self._entries.clear()
+        self._total_size = 0
+        self._dirty = True
+        # Any calls that are currently in progress were started before the cache was cleared, so
+        # their results must not be cached.
+        self._generation += 1
+
+    def _store(self, key: Hashable, value: Any, time_remaining: Optional[float] = None):
+        size = self._sizeof(value) if self._max_bytes is not None else 0
+
+        self._remove(key)
+        if self._max_bytes is not None and size > self._max_bytes:
+            # The value could never fit in the cache, so don't evict everything else to try
+            return
+
         timer = EggTimer()
-        lock = threading.Lock()
+        timer.set(
+            self._ttl + self._stale_while_revalidate if time_remaining is None else time_remaining
+        )
+        self._entries[key] = _CacheEntry(value, timer, size)
+        self._total_size += size
+        self._dirty = True
 
-        @wraps(fn)
-        def wrapper(*args, **kwargs) -> Any:
-            nonlocal cached_value, timer, lock
+        self._evict()
 
-            with lock:
-                if timer.is_expired():
-                    cached_value = fn(*args, **kwargs)
-                    timer.set(ttl)
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_size -= entry.size
 
-            return cached_value
+    def _evict(self):
+        # Expired entries at the front of the queue are dropped opportunistically so that an
+        # unbounded cache does not hold on to stale values forever.
+        while self._entries:
+            oldest_key = next(iter(self._entries))
+            oldest_entry = self._entries[oldest_key]
+            if oldest_entry.timer.is_expired():
+                self._remove(oldest_key)
+            elif not self._is_over_capacity():
+                break
+            elif oldest_entry.referenced:
+                oldest_entry.referenced = False
+                del self._entries[oldest_key]
+                self._entries[oldest_key] = oldest_entry
+            else:
+                self._remove(oldest_key)
 
-        def clear_cache():
-            nonlocal timer, lock
+    def _is_over_capacity(self) -> bool:
+        if self._maxsize is not None and len(self._entries) > self._maxsize:
+            return True
 
-            with lock:
-                timer.set(0)
+        if self._max_bytes is not None and self._total_size > self._max_bytes:
+            return True
 
-        wrapper.clear_cache = clear_cache  # type: ignore [attr-defined]
+        return False
 
-        return wrapper
+    def _enable_persistence(self, persist_dir: Path, persist_name: str):
+        try:
+            create_secure_directory(persist_dir)
+        except Exception:
+            logger.exception(f"Failed to create a directory to persist the values of {self._name}")
+            return
 
-    return decorator
+        self._persist_path = persist_dir / _get_persist_file_name(persist_name)
+        self._load()
+
+        _persisted_caches.add(self)
+        # The task only holds a weak reference to the cache, so that the cache can be garbage
+        # collected along with the decorated function
+        self._persist_task = get_default_scheduler().schedule(
+            partial(_persist_request_cache, weakref.ref(self)),
+            Schedule(_PERSIST_INTERVAL),
+            f"request_cache-{self._name}",
+        )
+
+    def _load(self):
+        assert self._persist_path is not None
+
+        try:
+            with open(self._persist_path, "rb") as f:
+                # Only trust files that no one else could have written, since unpickling a file
+                # can run arbitrary code
+                _check_persist_file_is_secure(self._persist_path, f.fileno())
+                persisted_entries = pickle.load(f)  # noqa: DUO103
+        except FileNotFoundError:
+            return
+        except Exception:
+            logger.exception(f"Failed to load the persisted return values of {self._name}")
+            return
+
+        now = time.time()
+        for key, value, expiration_time in persisted_entries:
+            time_remaining = expiration_time - now
+            if time_remaining > 0:
+                self._store(key, value, time_remaining)
+
+        self._dirty = False
+        logger.debug(f"Loaded {len(self._entries)} persisted return values of {self._name}")
+
+    def persist(self):
+        """
+        Save the cached return values if they have changed since they were last saved
+        """
+        if self._persist_path is None:
+            return
+
+        with self._persist_lock:
+            if not self._dirty:
+                return
+
+            # Any changes that are made while the entries are being saved will be saved next time
+            self._dirty = False
+            # Copying a dictionary is atomic, so the entries can be copied while other threads
+            # mutate them without acquiring the cache's lock
+            entries = self._entries.copy()
+
+            now = time.time()
+            persisted_entries = [
+                (key, entry.value, now + entry.timer.time_remaining_sec)
+                for key, entry in entries.items()
+            ]
+
+            try:
+                write_file_atomically(self._persist_path, pickle.dumps(persisted_entries))
+            except Exception:
+                logger.exception(f"Failed to persist the cached return values of {self._name}")
+
+
+# The caches that persist their return values, which are saved one last time when the program exits
+_persisted_caches: "weakref.WeakSet[_RequestCache]" = weakref.WeakSet()
+
+
+def _persist_request_caches():
+    for cache in list(_persisted_caches):
+        cache.persist()
+
+
+atexit.register(_persist_request_caches)
+
+
+def _persist_request_cache(cache_ref: "weakref.ref[_RequestCache]"):
+    cache = cache_ref()
+    if cache is not None:
+        cache.persist()
+
+
+class _Flight:
+    """
+    A single in-progress call to the decorated function that concurrent callers can wait on
+    """
+
+    __slots__ = ("generation", "done", "value", "error")
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self) -> Any:
+        self.done.wait()
+
+        if self.error is not None:
+            raise self.error
+
+        return self.value
+
+
+class _SyncRequestCache(_RequestCache):
+    """
+    A `_RequestCache` for regular functions that may be called from many threads
+
+    Cache hits do not acquire the lock. This is safe because `_entries` is only ever mutated while
+    the lock is held, and individual dictionary lookups and attribute assignments are atomic.
+
+    Misses are "single-flight": only one thread calls the decorated function for a given key, and
+    any other threads that miss on the same key wait for that call's result.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._flights: dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def get(self, args: tuple, kwargs: dict) -> Any:
+        key = self._make_key(args, kwargs)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            time_remaining = entry.timer.time_remaining_sec
+            if time_remaining > self._refresh_threshold:
+                entry.referenced = True
+                self._hits += 1
+                return entry.value
+
+            if time_remaining > 0:
+                entry.referenced = True
+                self._hits += 1
+                self._refresh_in_background(key, args, kwargs)
+                return entry.value
+
+        return self._refresh(key, args, kwargs)
+
+    def clear(self):
+        with self._acquire_lock():
+            self._clear()
+
+        self.persist()
+
+    @contextmanager
+    def _acquire_lock(self):
+        start = time.perf_counter()
+        with self._lock:
+            self._lock_wait_time += time.perf_counter() - start
+            yield
+
+    def _refresh(self, key: Hashable, args: tuple, kwargs: dict) -> Any:
+        with self._acquire_lock():
+            # Another thread may have refreshed the entry while this one waited for the lock
+            entry = self._entries.get(key)
+            if entry is not None and not entry.timer.is_expired():
+                self._hits += 1
+                return entry.value
+
+            self._misses += 1
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight(self._generation)
+                self._flights[key] = flight
+                is_leader = True
+            else:
+                is_leader = False
+
+        if not is_leader:
+            return flight.wait()
+
+        return self._call(key, flight, args, kwargs)
+
+    def _refresh_in_background(self, key: Hashable, args: tuple, kwargs: dict):
+        # Checking without the lock first keeps the lock off of the hit path while a refresh is
+        # already in progress
+        if key in self._flights:
+            return
+
+        with self._acquire_lock():
+            if key in self._flights:
+                return
+
+            flight = _Flight(self._generation)
+            self._flights[key] = flight
+            self._refreshes += 1
+
+        create_daemon_thread(
+            target=self._call_in_background,
+            name=f"request_cache-{self._name}",
+            args=(key, flight, args, kwargs),
+        ).start()
+
+    def _call_in_background(self, key: Hashable, flight: _Flight, args: tuple, kwargs: dict):
+        try:
+            self._call(key, flight, args, kwargs)
+        except Exception:
+            logger.exception(f"Failed to refresh the cached return value of {self._name}")
+
+    def _call(self, key: Hashable, flight: _Flight, args: tuple, kwargs: dict) -> Any:
+        start = time.perf_counter()
+        try:
+            flight.value = self._fn(*args, **kwargs)
+            return flight.value
+        except BaseException as err:
+            flight.error = err
+            raise
+        finally:
+            self._land(key, flight, time.perf_counter() - start)
+
+    def _land(self, key: Hashable, flight: _Flight, call_time: float):
+        with self._acquire_lock():
+            del self._flights[key]
+            self._call_time += call_time
+
+            if flight.error is not None:
+                self._errors += 1
+            elif flight.generation == self._generation:
+                self._store(key, flight.value)
+
+        flight.done.set()
+        self._publish_stats()
+
+
+class _AsyncRequestCache(_RequestCache):
+    """
+    A `_RequestCache` for coroutine functions
+
+    All callers must share a single event loop. Since the event loop only switches between tasks
+    at an `await`, no locks are needed to keep the cache consistent.
+
+    Misses are "single-flight": only one task awaits the decorated coroutine function for a given
+    key, and any other callers that miss on the same key await that task's result.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+
+    async def get(self, args: tuple, kwargs: dict) -> Any:
+        key = self._make_key(args, kwargs)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            time_remaining = entry.timer.time_remaining_sec
+            if time_remaining > self._refresh_threshold:
+                entry.referenced = True
+                self._hits += 1
+                return entry.value
+
+            if time_remaining > 0:
+                entry.referenced = True
+                self._hits += 1
+                self._refresh_in_background(key, args, kwargs)
+                return entry.value
+
+        self._misses += 1
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._create_task(key, args, kwargs)
+
+        # Cancelling one caller must not cancel the call that the other callers are waiting on
+        return await asyncio.shield(task)
+
+    def clear(self):
+        self._clear()
+        self._persist_in_background()
+
+    def _refresh_in_background(self, key: Hashable, args: tuple, kwargs: dict):
+        if key in self._tasks:
+            return
+
+        self._refreshes += 1
+        self._create_task(key, args, kwargs).add_done_callback(self._log_background_error)
+
+    def _create_task(self, key: Hashable, args: tuple, kwargs: dict) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(
+            self._call(key, self._generation, args, kwargs), name=f"request_cache-{self._name}"
+        )
+        self._tasks[key] = task
+
+        return task
+
+    async def _call(self, key: Hashable, generation: int, args: tuple, kwargs: dict) -> Any:
+        start = time.perf_counter()
+        try:
+            value = await self._fn(*args, **kwargs)
+            if generation == self._generation:
+                self._store(key, value)
+
+            return value
+        except BaseException:
+            self._errors += 1
+            raise
+        finally:
+            del self._tasks[key]
+            self._call_time += time.perf_counter() - start
+            self._publish_stats()
+
+    def _persist_in_background(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # The cache was cleared from outside of the event loop
+            self.persist()
+            return
+
+        # Writing to disk would block the event loop
+        loop.run_in_executor(None, self.persist)
+
+    def _log_background_error(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                f"Failed to refresh the cached return value of {self._name}",
+                exc_info=task.exception(),
+            )
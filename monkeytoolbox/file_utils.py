@@ -1,22 +1,54 @@
+import codecs
+import fnmatch
 import hashlib
 import io
+import json
+import locale
 import logging
+import mmap
 import os
+import queue
+import re
 import shutil
+import socket
+import stat
+import tempfile
+import weakref
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from enum import Enum
+from functools import partial
 from pathlib import Path
-from typing import BinaryIO
-from collections.abc import Iterable
+from threading import Lock
+from typing import BinaryIO, Optional, TypeVar, Union, cast
+
+from .code_utils import insecure_generate_random_string
+from .scheduler import PeriodicScheduler, Schedule, ScheduledTask, get_default_scheduler
+from .secure_file import open_new_securely_permissioned_file
+from .threading import create_daemon_thread
 
 logger = logging.getLogger(__name__)
 
 
 MAX_BLOCK_SIZE = 65536
+SPOOLED_COPY_MAX_MEMORY_SIZE = 16 * 1024 * 1024
+_KERNEL_COPY_SIZE = 1024 * 1024 * 1024
+APPENDER_MAX_BUFFER_SIZE = 1024 * 1024
+_MAX_IOVECS = 1024
+_MAX_QUEUED_BLOCKS = 8
+
+_Destination = TypeVar("_Destination", BinaryIO, socket.socket)
 
 
 class InvalidPath(Exception):
     pass
 
 
+class FileTooLargeError(Exception):
+    pass
+
+
 def expand_path(path: str) -> Path:
     if not path:
         raise InvalidPath("Empty path provided")
@@ -24,22 +56,566 @@ def expand_path(path: str) -> Path:
     return Path(os.path.expandvars(os.path.expanduser(path)))
 
 
-def get_binary_io_sha256_hash(binary: BinaryIO) -> str:
+def get_binary_io_sha256_hash(binary: BinaryIO, block_size: int = MAX_BLOCK_SIZE) -> str:
     """
     Calculates sha256 hash from a file-like object
 
+    The hash is calculated from the file-like object's current position to its end. If the
+    file-like object is a `BytesIO`, its buffer is hashed without being copied. Otherwise, if it
+    supports `readinto()`, it is read into a single reusable buffer of `block_size` bytes. hashlib
+    releases the GIL while hashing large blocks, so other threads can run during the calculation.
+
     :param binary: file-like object from which we calculate the hash
+    :param block_size: The number of bytes to read at a time, defaults to MAX_BLOCK_SIZE
     :return: sha256 hash from the file-like object
     """
     sha256 = hashlib.sha256()
-    for block in iter(lambda: binary.read(MAX_BLOCK_SIZE), b""):
+    for block in _iter_blocks(binary, block_size):
         sha256.update(block)
 
     return sha256.hexdigest()
 
 
+def get_binary_io_hashes(
+    binary: BinaryIO,
+    algorithms: Iterable[str],
+    block_size: int = MAX_BLOCK_SIZE,
+    *,
+    parallel: bool = False,
+) -> dict[str, str]:
+    """
+    Calculates multiple hashes from a file-like object in a single pass
+
+    The file-like object is read once, from its current position to its end, in the same way as
+    `get_binary_io_sha256_hash()`, and each block is used to update every hash.
+
+    If `parallel` is True, each hash is instead updated by its own thread, which is fed blocks
+    through a bounded queue. Since hashlib releases the GIL while hashing large blocks, the file is
+    read while the hashes of previous blocks are calculated, and the time taken can be reduced to
+    approximately that of the slowest algorithm when enough CPUs are available. A new block is
+    allocated for each read, so larger block sizes reduce the overhead.
+
+    :param binary: file-like object from which we calculate the hashes
+    :param algorithms: The names of the hash algorithms to use, such as "sha256", "sha1", and "md5".
+                       Any name that is accepted by `hashlib.new()` may be used, except for those
+                       of variable-length algorithms.
+    :param block_size: The number of bytes to read at a time, defaults to MAX_BLOCK_SIZE
+    :param parallel: Whether to update the hashes in parallel threads, defaults to False
+    :return: A mapping of each algorithm name to the hash that was calculated with it
+    :raises ValueError: If an algorithm is not supported
+    """
+    hashers = _new_hashers(algorithms)
+
+    if parallel and len(hashers) > 1:
+        _update_hashes_in_parallel(list(hashers.values()), binary, block_size)
+    else:
+        for block in _iter_blocks(binary, block_size):
+            for hasher in hashers.values():
+                hasher.update(block)
+
+    return {algorithm: hasher.hexdigest() for algorithm, hasher in hashers.items()}
+
+
+def copy_binary_io_with_hashes(
+    src: BinaryIO,
+    dst: _Destination,
+    algorithms: Iterable[str] = ("sha256",),
+    block_size: int = MAX_BLOCK_SIZE,
+) -> tuple[dict[str, str], _Destination]:
+    """
+    Copies a file-like object to a destination and calculates hashes of it in a single pass
+
+    The file-like object is read once, from its current position to its end, in the same way as
+    `get_binary_io_sha256_hash()`. Each block is written to the destination and used to update
+    every hash. Neither the source nor the destination is rewound.
+
+    :param src: A file-like object to copy
+    :param dst: A writable file-like object or a connected socket to which the source is copied
+    :param algorithms: The names of the hash algorithms to use, as in `get_binary_io_hashes()`,
+                       defaults to ("sha256",)
+    :param block_size: The number of bytes to read at a time, defaults to MAX_BLOCK_SIZE
+    :return: A mapping of each algorithm name to the hash that was calculated with it, and the
+             destination
+    :raises ValueError: If an algorithm is not supported
+    """
+    hashers = _new_hashers(algorithms)
+    write = _get_write_function(dst)
+
+    for block in _iter_blocks(src, block_size):
+        write(block)
+        for hasher in hashers.values():
+            hasher.update(block)
+
+    return {algorithm: hasher.hexdigest() for algorithm, hasher in hashers.items()}, dst
+
+
+def _new_hashers(algorithms: Iterable[str]) -> dict[str, "hashlib._Hash"]:
+    hashers = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+    for algorithm, hasher in hashers.items():
+        if hasher.digest_size == 0:
+            raise ValueError(f"Variable-length hash algorithms are not supported: {algorithm}")
+
+    return hashers
+
+
+def _update_hashes_in_parallel(hashers: list["hashlib._Hash"], binary: BinaryIO, block_size: int):
+    # Blocks are never modified after they're read, so the file can be read ahead of the slowest
+    # hash until its queue is full, and each hash is only ever updated by its own thread, in order.
+    block_queues: list[queue.Queue[Optional[Union[bytes, memoryview]]]] = [
+        queue.Queue(maxsize=_MAX_QUEUED_BLOCKS) for _ in hashers
+    ]
+    threads = [
+        create_daemon_thread(
+            target=_update_hash_from_queue, name=f"HashUpdater-{hasher.name}", args=(hasher, q)
+        )
+        for hasher, q in zip(hashers, block_queues)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for block in _iter_immutable_blocks(binary, block_size):
+            for q in block_queues:
+                q.put(block)
+    finally:
+        for q in block_queues:
+            q.put(None)
+
+        for thread in threads:
+            thread.join()
+
+
+def _update_hash_from_queue(
+    hasher: "hashlib._Hash", block_queue: queue.Queue[Optional[Union[bytes, memoryview]]]
+):
+    while (block := block_queue.get()) is not None:
+        hasher.update(block)
+
+
+def _iter_immutable_blocks(binary: BinaryIO, block_size: int) -> Iterator[Union[bytes, memoryview]]:
+    """
+    Read a file-like object from its current position to its end
+
+    Unlike `_iter_blocks()`, a block remains valid after the next block has been read.
+    """
+    if isinstance(binary, io.BytesIO):
+        # The buffer is shared with the `BytesIO` until it is modified, so it isn't copied
+        remaining = memoryview(binary.getvalue())[binary.tell() :]
+        binary.seek(0, io.SEEK_END)
+        if remaining:
+            yield remaining
+
+        return
+
+    yield from iter(lambda: binary.read(block_size), b"")
+
+
+def _iter_blocks(binary: BinaryIO, block_size: int) -> Iterator[Union[bytes, memoryview]]:
+    """
+    Read a file-like object from its current position to its end
+
+    To avoid allocations, blocks may be views of a reusable buffer. A block is only valid until the
+    next block has been read.
+    """
+    if isinstance(binary, io.BytesIO):
+        position = binary.tell()
+        with binary.getbuffer() as contents, contents[position:] as remaining:
+            yield remaining
+
+        binary.seek(0, io.SEEK_END)
+        return
+
+    readinto = getattr(binary, "readinto", None)
+    if readinto is None:
+        yield from iter(lambda: binary.read(block_size), b"")
+        return
+
+    buffer = memoryview(bytearray(block_size))
+    while num_bytes := readinto(buffer):
+        yield buffer[:num_bytes]
+
+
+_FILE_HASH_CACHE_VERSION = 1
+
+
+# (device, inode, size, mtime_ns)
+_StatSignature = tuple[int, int, int, int]
+
+
+class FileHashCache:
+    """
+    A cache of sha256 hashes of files, keyed by the files' stat signatures
+
+    A file's stat signature is its device, inode, size, and modification time in nanoseconds. If
+    any of these change, the file is assumed to have changed and must be hashed again. If a cache
+    file is provided, the cache is loaded from it and can be saved to it by calling `save()`, so
+    that the cache survives restarts.
+
+    The hashes of files that have since changed or been deleted are never looked up again, so the
+    cache should be pruned with `prune()` after hashing all of the files that are of interest, such
+    as after each scan of a directory tree. This class is thread-safe.
+    """
+
+    def __init__(self, cache_file: Optional[Path] = None):
+        """
+        :param cache_file: A file to load the cache from and save it to. If None (default), the
+                           cache is not persisted.
+        """
+        self._cache_file = cache_file
+        self._hashes: dict[_StatSignature, str] = {}
+        # The signatures that have been looked up or cached since the cache was last pruned
+        self._used_signatures: set[_StatSignature] = set()
+        self._lock = Lock()
+
+        if cache_file is not None:
+            self._load(cache_file)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def get(self, file_stat: os.stat_result) -> Optional[str]:
+        """
+        Get the cached hash of a file
+
+        :param file_stat: The result of calling `os.stat()` on the file
+        :return: The file's hash, or None if it is not cached or the file has changed
+        """
+        signature = _get_stat_signature(file_stat)
+        file_hash = self._hashes.get(signature)
+        if file_hash is not None:
+            self._used_signatures.add(signature)
+
+        return file_hash
+
+    def set(self, file_stat: os.stat_result, file_hash: str):
+        """
+        Cache the hash of a file
+
+        :param file_stat: The result of calling `os.stat()` on the file before it was hashed
+        :param file_hash: The file's hash
+        """
+        signature = _get_stat_signature(file_stat)
+        with self._lock:
+            self._hashes[signature] = file_hash
+            self._used_signatures.add(signature)
+
+    def prune(self):
+        """
+        Remove the hashes that have not been looked up or cached since the cache was created or
+        last pruned
+        """
+        with self._lock:
+            self._hashes = {
+                signature: file_hash
+                for signature, file_hash in self._hashes.items()
+                if signature in self._used_signatures
+            }
+            self._used_signatures = set()
+
+    def save(self):
+        """
+        Save the cache to its cache file
+
+        :raises ValueError: If the cache has no cache file
+        """
+        if self._cache_file is None:
+            raise ValueError("The cache has no cache file")
+
+        with self._lock:
+            entries = [[*signature, file_hash] for signature, file_hash in self._hashes.items()]
+
+        write_file_atomically(
+            self._cache_file,
+            json.dumps({"version": _FILE_HASH_CACHE_VERSION, "hashes": entries}).encode(),
+        )
+
+    def _load(self, cache_file: Path):
+        try:
+            with open(cache_file, "rb") as f:
+                contents = json.load(f)
+
+            if contents.get("version") != _FILE_HASH_CACHE_VERSION:
+                logger.warning(f"Ignoring the file hash cache in {cache_file}: unsupported version")
+                return
+
+            self._hashes = {
+                (device, inode, size, mtime_ns): file_hash
+                for device, inode, size, mtime_ns, file_hash in contents["hashes"]
+            }
+        except FileNotFoundError:
+            return
+        except Exception:
+            logger.exception(f"Failed to load the file hash cache from {cache_file}")
+            return
+
+        logger.debug(f"Loaded {len(self._hashes)} file hashes from {cache_file}")
+
+
+def _get_stat_signature(file_stat: os.stat_result) -> _StatSignature:
+    return (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+
+
+def get_file_sha256_hashes(
+    file_paths: Iterable[Path],
+    *,
+    cache: Optional[FileHashCache] = None,
+    max_workers: Optional[int] = None,
+    block_size: int = MAX_BLOCK_SIZE,
+) -> dict[Path, str]:
+    """
+    Calculates the sha256 hashes of many files in parallel
+
+    Each file is hashed in the same way as `get_binary_io_sha256_hash()`, in a pool of threads. If
+    a cache is provided, files whose stat signatures are in the cache are not read, and the hashes
+    of the other files are added to the cache. Files that can't be hashed, for example because they
+    don't exist or are directories, are logged and omitted from the result.
+
+    :param file_paths: The paths of the files to hash
+    :param cache: A cache of file hashes, defaults to None
+    :param max_workers: The maximum number of threads to hash files in, defaults to the
+                        `ThreadPoolExecutor` default
+    :param block_size: The number of bytes to read at a time, defaults to MAX_BLOCK_SIZE
+    :return: A mapping of each file path that was hashed to its hash
+    """
+    hash_file = partial(_get_file_sha256_hash, cache=cache, block_size=block_size)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        paths = list(file_paths)
+        return {
+            path: file_hash
+            for path, file_hash in zip(paths, executor.map(hash_file, paths))
+            if file_hash is not None
+        }
+
+
+def _get_file_sha256_hash(
+    file_path: Path, cache: Optional[FileHashCache], block_size: int
+) -> Optional[str]:
+    try:
+        if cache is not None:
+            file_hash = cache.get(os.stat(file_path))
+            if file_hash is not None:
+                return file_hash
+
+        with open(file_path, "rb") as f:
+            # The hash is cached with the signature from before it was calculated, so that any
+            # change made while it's being calculated causes it to be calculated again next time
+            file_stat = os.fstat(f.fileno())
+            file_hash = get_binary_io_sha256_hash(f, block_size)
+    except OSError as err:
+        logger.warning(f"Failed to hash {file_path}: {err}")
+        return None
+
+    if cache is not None:
+        cache.set(file_stat, file_hash)
+
+    return file_hash
+
+
 def get_all_regular_files_in_directory(dir_path: Path) -> Iterable[Path]:
-    return filter(lambda f: f.is_file(), dir_path.iterdir())
+    return walk_regular_files(dir_path, max_depth=0)
+
+
+class SymlinkPolicy(Enum):
+    """
+    How `walk_regular_files()` treats symbolic links
+    """
+
+    SKIP = "skip"
+    """Symbolic links are ignored"""
+
+    FILES = "files"
+    """Symbolic links to regular files are yielded, but symbolic links to directories are ignored"""
+
+    FOLLOW = "follow"
+    """Symbolic links are followed. Each directory is walked at most once, which prevents loops."""
+
+
+def walk_regular_files(
+    dir_path: Path,
+    *,
+    max_depth: Optional[int] = None,
+    patterns: Optional[Iterable[str]] = None,
+    extensions: Optional[Iterable[str]] = None,
+    symlink_policy: SymlinkPolicy = SymlinkPolicy.FILES,
+    max_workers: int = 1,
+) -> Iterator[Path]:
+    """
+    Recursively yields the regular files in a directory
+
+    Directories are listed with `os.scandir()`, and the file type information that it returns is
+    used instead of calling `stat()` on each file where possible. Files are filtered by name as
+    they are found, so no `Path` is created for a file that is filtered out. Subdirectories that
+    can't be listed are logged and skipped.
+
+    If `max_workers` is greater than 1, subdirectories are listed in parallel by a pool of threads,
+    and files are yielded in no particular order.
+
+    :param dir_path: The directory to walk
+    :param max_depth: The maximum depth of subdirectories to walk. If 0, only the files in
+                      `dir_path` are yielded. If None (default), all subdirectories are walked.
+    :param patterns: Glob patterns, such as "*.txt", that file names must match at least one of.
+                     If None (default), file names are not matched against patterns.
+    :param extensions: Extensions, such as ".txt", that file names must end with at least one of.
+                       If None (default), file names are not matched against extensions.
+    :param symlink_policy: How to treat symbolic links, defaults to `SymlinkPolicy.FILES`
+    :param max_workers: The maximum number of threads that list directories, defaults to 1
+    :return: An iterator of the paths of the regular files in the directory
+    :raises OSError: If `dir_path` can't be listed
+    """
+    walker = _DirectoryWalker(max_depth, patterns, extensions, symlink_policy)
+
+    # Fail when called, rather than when iteration starts, if the top-level directory can't be
+    # listed. The directory is listed again once iteration starts so that no file descriptor is
+    # held open by an iterator that is never used.
+    os.scandir(dir_path).close()
+    walker.visit(str(dir_path))
+
+    if max_workers > 1:
+        file_paths = walker.walk_in_parallel(str(dir_path), max_workers)
+    else:
+        file_paths = walker.walk(str(dir_path))
+
+    return map(Path, file_paths)
+
+
+# The paths of the files in a directory, and the paths and depths of its subdirectories
+_DirectoryListing = tuple[list[str], list[tuple[str, int]]]
+
+
+class _DirectoryWalker:
+    def __init__(
+        self,
+        max_depth: Optional[int],
+        patterns: Optional[Iterable[str]],
+        extensions: Optional[Iterable[str]],
+        symlink_policy: SymlinkPolicy,
+    ):
+        self._max_depth = max_depth
+        self._match_pattern = (
+            None
+            if patterns is None
+            else re.compile("|".join(fnmatch.translate(p) for p in patterns)).match
+        )
+        self._extensions = None if extensions is None else tuple(extensions)
+        self._symlink_policy = symlink_policy
+
+        self._visited_directories: set[tuple[int, int]] = set()
+
+    def walk(self, dir_path: str) -> Iterator[str]:
+        # Files are yielded as they are listed, and only the paths of subdirectories are held in
+        # memory until they are walked, so that huge directories are walked in constant memory.
+        path, depth = dir_path, 0
+        stack: list[tuple[str, int]] = []
+        while True:
+            subdirectories: list[tuple[str, int]] = []
+            yield from self._iter_file_paths(path, depth, subdirectories, raise_errors=depth == 0)
+
+            stack.extend(s for s in reversed(subdirectories) if self.visit(s[0]))
+            if not stack:
+                return
+
+            path, depth = stack.pop()
+
+    def walk_in_parallel(self, dir_path: str, max_workers: int) -> Iterator[str]:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            listings = [self.scan(dir_path, 0, raise_errors=True)]
+            pending: set[Future[_DirectoryListing]] = set()
+            while True:
+                for file_paths, subdirectories in listings:
+                    yield from file_paths
+
+                    for subdirectory, depth in subdirectories:
+                        if self.visit(subdirectory):
+                            pending.add(executor.submit(self.scan, subdirectory, depth))
+
+                if not pending:
+                    return
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                listings = [future.result() for future in done]
+        finally:
+            # Don't list any more directories if the caller stops iterating early
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def scan(self, path: str, depth: int, raise_errors: bool = False) -> _DirectoryListing:
+        subdirectories: list[tuple[str, int]] = []
+        file_paths = list(self._iter_file_paths(path, depth, subdirectories, raise_errors))
+
+        return file_paths, subdirectories
+
+    def _iter_file_paths(
+        self,
+        path: str,
+        depth: int,
+        subdirectories: list[tuple[str, int]],
+        raise_errors: bool = False,
+    ) -> Iterator[str]:
+        """
+        Yield the paths of the matching files in a directory as they are listed
+
+        :param subdirectories: A list to which the paths and depths of the subdirectories that
+                               should be walked are appended
+        """
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if self._is_matching_file(entry, depth, subdirectories):
+                            yield entry.path
+                    except OSError as err:
+                        logger.debug(f"Skipping {entry.path}: {err}")
+        except OSError as err:
+            if raise_errors:
+                raise
+
+            logger.warning(f"Failed to list the directory {path}: {err}")
+
+    def _is_matching_file(
+        self, entry: os.DirEntry, depth: int, subdirectories: list[tuple[str, int]]
+    ) -> bool:
+        if self._symlink_policy == SymlinkPolicy.SKIP and entry.is_symlink():
+            return False
+
+        follow_symlinks = self._symlink_policy == SymlinkPolicy.FOLLOW
+        if entry.is_dir(follow_symlinks=follow_symlinks):
+            if self._max_depth is None or depth < self._max_depth:
+                subdirectories.append((entry.path, depth + 1))
+            return False
+
+        return entry.is_file() and self._matches(entry.name)
+
+    def _matches(self, name: str) -> bool:
+        if self._extensions is not None and not name.endswith(self._extensions):
+            return False
+
+        if self._match_pattern is not None and not self._match_pattern(name):
+            return False
+
+        return True
+
+    def visit(self, path: str) -> bool:
+        """
+        Record that a directory is being walked
+
+        :return: False if the directory has already been walked, True otherwise
+        """
+        if self._symlink_policy != SymlinkPolicy.FOLLOW:
+            return True
+
+        try:
+            path_stat = os.stat(path)
+        except OSError:
+            return True
+
+        key = (path_stat.st_dev, path_stat.st_ino)
+        if key in self._visited_directories:
+            logger.debug(f"Skipping {path}, which has already been walked")
+            return False
+
+        self._visited_directories.add(key)
+        return True
 
 
 def get_text_file_contents(file_path: Path) -> str:
@@ -48,16 +624,124 @@ def get_text_file_contents(file_path: Path) -> str:
     return file_contents
 
 
+def iter_text_file_chunks(
+    file_path: Path,
+    chunk_size: int = MAX_BLOCK_SIZE,
+    *,
+    encoding: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Reads a text file in chunks
+
+    The file is read in blocks of `chunk_size` bytes, which are decoded incrementally, so memory use
+    does not depend on the size of the file. As with `get_text_file_contents()`, all newlines are
+    translated to line feeds.
+
+    :param file_path: The path of the file to read
+    :param chunk_size: The number of bytes to read at a time, defaults to MAX_BLOCK_SIZE
+    :param encoding: The file's encoding. If None (default), the locale's preferred encoding is
+                     used, as with `open()`.
+    :param max_bytes: The maximum number of bytes to read. If None (default), the entire file is
+                      read.
+    :return: An iterator of the decoded chunks of the file. Chunks may contain partial lines.
+    :raises FileTooLargeError: If the file is larger than `max_bytes`
+    """
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(encoding or locale.getpreferredencoding(False))(),
+        translate=True,
+    )
+
+    num_bytes = 0
+    with open(file_path, "rb") as f:
+        for block in _iter_blocks(f, chunk_size):
+            num_bytes += len(block)
+            if max_bytes is not None and num_bytes > max_bytes:
+                raise FileTooLargeError(f"{file_path} is larger than {max_bytes} bytes")
+
+            if chunk := decoder.decode(block):
+                yield chunk
+
+    if chunk := decoder.decode(b"", final=True):
+        yield chunk
+
+
+def iter_text_file_lines(
+    file_path: Path, *, encoding: Optional[str] = None, max_bytes: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Reads a text file line by line
+
+    The file is read with `iter_text_file_chunks()`. Like iterating over a file object, each line
+    includes its trailing newline, if it has one.
+
+    :param file_path: The path of the file to read
+    :param encoding: The file's encoding. If None (default), the locale's preferred encoding is
+                     used, as with `open()`.
+    :param max_bytes: The maximum number of bytes to read. If None (default), the entire file is
+                      read. This also limits the length of a line.
+    :return: An iterator of the lines of the file
+    :raises FileTooLargeError: If the file is larger than `max_bytes`
+    """
+    # Parts of a line that spans multiple chunks are joined once the line is complete
+    line_parts: list[str] = []
+    for chunk in iter_text_file_chunks(file_path, encoding=encoding, max_bytes=max_bytes):
+        *lines, last_line_part = chunk.split("\n")
+        if lines:
+            line_parts.append(lines[0])
+            lines[0] = "".join(line_parts)
+            line_parts.clear()
+
+            for line in lines:
+                yield f"{line}\n"
+
+        if last_line_part:
+            line_parts.append(last_line_part)
+
+    if line_parts:
+        yield "".join(line_parts)
+
+
+@contextmanager
+def memory_map_file(file_path: Path) -> Iterator[memoryview]:
+    """
+    Maps a file into memory for reading
+
+    The contents of the file are accessed through a read-only `memoryview`, which can be sliced
+    without copying. Pages of the file are only read when they are accessed, and the operating
+    system can reclaim them under memory pressure, so files larger than the available memory can
+    be read.
+
+    Any slices of the `memoryview` must be released before the context manager exits.
+
+    :param file_path: The path of the file to map
+    :return: A context manager that provides a `memoryview` of the file's contents
+    """
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            yield memoryview(b"")
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            with memoryview(mapped_file) as contents:
+                yield contents
+
+
 def make_fileobj_copy(src: BinaryIO) -> BinaryIO:
     """
     Creates a file-like object that is a copy of the provided file-like object
 
     The source file-like object is reset to position 0 and a copy is made. Both the source file and
-    the copy are reset to position 0 before returning.
+    the copy are reset to position 0 before returning. If the source is a `BytesIO`, the copy
+    shares its buffer until either of them is modified.
 
     :param src: A file-like object to copy
     :return: A file-like object that is a copy of the provided file-like object
     """
+    if isinstance(src, io.BytesIO):
+        return _share_bytes_io(src)
+
     dst = io.BytesIO()
 
     src.seek(0)
@@ -69,6 +753,186 @@ def make_fileobj_copy(src: BinaryIO) -> BinaryIO:
     return dst
 
 
+def make_spooled_fileobj_copy(
+    src: BinaryIO,
+    max_memory_size: int = SPOOLED_COPY_MAX_MEMORY_SIZE,
+    temp_dir: Optional[Path] = None,
+) -> BinaryIO:
+    """
+    Creates a copy of a file-like object without holding more than `max_memory_size` bytes of it
+    in memory
+
+    Like `make_fileobj_copy()`, the entire source is copied and both the source and the copy are
+    reset to position 0 before returning, but:
+        - If the source is a `BytesIO`, the copy shares its buffer until either of them is
+          modified, so no additional memory is used.
+        - If the source is a regular file that is larger than `max_memory_size`, it is copied to
+          a temporary file with `copy_binary_io()`, which avoids copying the data through
+          userspace and, on filesystems that support it, shares the data on disk.
+        - Otherwise, the source is copied to a `SpooledTemporaryFile`, which is moved to disk if
+          it grows larger than `max_memory_size`.
+
+    The temporary file is deleted when the copy is closed.
+
+    :param src: A file-like object to copy
+    :param max_memory_size: The maximum number of bytes of the copy to keep in memory, defaults to
+                            SPOOLED_COPY_MAX_MEMORY_SIZE
+    :param temp_dir: The directory in which to create the temporary file, defaults to the
+                     system's temporary directory. A directory on the same filesystem as the source
+                     allows the data to be shared on disk.
+    :return: A file-like object that is a copy of the provided file-like object
+    """
+    if isinstance(src, io.BytesIO):
+        return _share_bytes_io(src)
+
+    dst: BinaryIO
+    src.seek(0)
+
+    src_fd = _get_regular_file_descriptor(src)
+    if src_fd is not None and os.fstat(src_fd).st_size > max_memory_size:
+        dst = tempfile.TemporaryFile(dir=temp_dir)
+        copy_binary_io(src, dst)
+    else:
+        # A SpooledTemporaryFile is moved to disk if its fileno() is called, so it can't be passed
+        # to copy_binary_io()
+        dst = cast(BinaryIO, tempfile.SpooledTemporaryFile(max_memory_size, dir=_fspath(temp_dir)))
+        _copy_blocks(src, dst)
+
+    src.seek(0)
+    dst.seek(0)
+
+    return dst
+
+
+def _fspath(path: Optional[Path]) -> Optional[str]:
+    return None if path is None else os.fspath(path)
+
+
+def _share_bytes_io(src: io.BytesIO) -> io.BytesIO:
+    # In CPython, getvalue() returns the BytesIO's internal buffer without copying it (unless a
+    # view of it has been exported with getbuffer()), and a new BytesIO that is initialized with a
+    # bytes object shares it. Whichever BytesIO is written to first makes its own copy.
+    src.seek(0)
+    return io.BytesIO(src.getvalue())
+
+
+def copy_binary_io(src: BinaryIO, dst: Union[BinaryIO, socket.socket]) -> int:
+    """
+    Copies a file-like object, from its current position to its end, to a destination
+
+    If the source is a regular file and the destination has a file descriptor, the data is copied
+    by the kernel with `os.copy_file_range()` or `os.sendfile()`, so that it does not pass through
+    userspace. On filesystems that support it, `os.copy_file_range()` shares the data on disk
+    instead of copying it. Otherwise, or if the kernel can't copy between the two files, the data
+    is copied in blocks through a single reusable buffer.
+
+    The source's position, and the destination's position if it is a file, are advanced past the
+    data that was copied.
+
+    :param src: A file-like object to copy
+    :param dst: A writable file-like object or a connected socket to which the source is copied
+    :return: The number of bytes that were copied
+    """
+    src_fd = _get_regular_file_descriptor(src)
+    dst_fd = _get_file_descriptor(dst)
+    if src_fd is None or dst_fd is None:
+        return _copy_blocks(src, dst)
+
+    src_offset = src.tell()
+    dst_offset = None
+    if not isinstance(dst, socket.socket):
+        dst.flush()
+        if dst.seekable():
+            dst_offset = dst.tell()
+
+    copied = 0
+    for kernel_copy in _get_kernel_copy_functions(dst_fd, dst_offset):
+        try:
+            while num_bytes := kernel_copy(
+                src_fd, dst_fd, src_offset + copied, _add_offset(dst_offset, copied)
+            ):
+                copied += num_bytes
+            break
+        except OSError as err:
+            logger.debug(f"Failed to copy {src_fd} to {dst_fd} with {kernel_copy.__name__}: {err}")
+
+    # Kernel copies bypass the file objects' buffers and, with explicit offsets, don't move the
+    # file descriptors' positions, so the file objects must be repositioned
+    src.seek(src_offset + copied)
+    if dst_offset is not None:
+        dst.seek(dst_offset + copied)  # type: ignore [union-attr]
+
+    return copied + _copy_blocks(src, dst)
+
+
+def _get_file_descriptor(binary: Union[BinaryIO, socket.socket]) -> Optional[int]:
+    try:
+        return binary.fileno()
+    except (AttributeError, OSError, ValueError):
+        # io.UnsupportedOperation is a subclass of both OSError and ValueError
+        return None
+
+
+def _get_regular_file_descriptor(binary: BinaryIO) -> Optional[int]:
+    fd = _get_file_descriptor(binary)
+    if fd is not None and _is_regular_file(fd):
+        return fd
+
+    return None
+
+
+def _is_regular_file(fd: int) -> bool:
+    try:
+        return stat.S_ISREG(os.fstat(fd).st_mode)
+    except OSError:
+        return False
+
+
+def _add_offset(offset: Optional[int], num_bytes: int) -> Optional[int]:
+    return None if offset is None else offset + num_bytes
+
+
+def _get_kernel_copy_functions(
+    dst_fd: int, dst_offset: Optional[int]
+) -> Iterator[Callable[[int, int, int, Optional[int]], int]]:
+    if hasattr(os, "copy_file_range") and dst_offset is not None and _is_regular_file(dst_fd):
+        yield _copy_file_range
+
+    if hasattr(os, "sendfile"):
+        yield _sendfile
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, src_offset: int, dst_offset: Optional[int]) -> int:
+    return os.copy_file_range(src_fd, dst_fd, _KERNEL_COPY_SIZE, src_offset, dst_offset)
+
+
+def _sendfile(src_fd: int, dst_fd: int, src_offset: int, dst_offset: Optional[int]) -> int:
+    if dst_offset is not None:
+        os.lseek(dst_fd, dst_offset, os.SEEK_SET)
+
+    return os.sendfile(dst_fd, src_fd, src_offset, _KERNEL_COPY_SIZE)
+
+
+def _copy_blocks(src: BinaryIO, dst: Union[BinaryIO, socket.socket]) -> int:
+    write = _get_write_function(dst)
+
+    copied = 0
+    for block in _iter_blocks(src, MAX_BLOCK_SIZE):
+        write(block)
+        copied += len(block)
+
+    return copied
+
+
+def _get_write_function(
+    dst: Union[BinaryIO, socket.socket]
+) -> Callable[[Union[bytes, memoryview]], object]:
+    if isinstance(dst, socket.socket):
+        return dst.sendall
+
+    return dst.write
+
+
 def append_bytes(file: BinaryIO, bytes_to_append: bytes) -> BinaryIO:
     starting_position = file.tell()
 
@@ -77,3 +941,201 @@ def append_bytes(file: BinaryIO, bytes_to_append: bytes) -> BinaryIO:
     file.seek(starting_position, io.SEEK_SET)
 
     return file
+
+
+def append_binary_io(file: BinaryIO, src: BinaryIO) -> BinaryIO:
+    """
+    Appends the contents of a file-like object to a file without loading them into memory
+
+    The source is copied from its current position to its end with `copy_binary_io()`. The
+    file's position is restored before returning.
+
+    :param file: A writable and seekable file-like object to append to
+    :param src: A file-like object whose contents are appended
+    :return: The file that was appended to
+    """
+    starting_position = file.tell()
+
+    file.seek(0, io.SEEK_END)
+    copy_binary_io(src, file)
+    file.seek(starting_position, io.SEEK_SET)
+
+    return file
+
+
+class BatchedAppender:
+    """
+    Appends chunks of bytes to the end of a file in batches
+
+    Chunks are buffered in memory and appended to the file together when `max_buffer_size` bytes
+    have been buffered, when `flush()` or `close()` is called, and, if `max_delay` is set, at least
+    every `max_delay` seconds. If the file is a regular file and `os.pwritev()` is available, each
+    batch is written with vectored writes at the end of the file, without joining the chunks or
+    moving the file's position. Otherwise, the file is seeked to its end and back once per batch.
+    Either way, as with `append_bytes()`, the file's position is the same after each batch as
+    before it.
+
+    The file is not closed by `close()`. An appender that is garbage collected without being closed
+    is closed then. The appender's methods can be called from multiple threads. However, if the
+    file is seeked, a batch that is appended in another thread, such as the one that flushes the
+    appender every `max_delay` seconds, moves the file's position while it is written. In that
+    case, the file must not be used by any other thread, except through the appender, until the
+    appender is closed.
+    """
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        max_buffer_size: int = APPENDER_MAX_BUFFER_SIZE,
+        max_delay: Optional[float] = None,
+        scheduler: Optional[PeriodicScheduler] = None,
+    ):
+        """
+        :param file: A writable and seekable file-like object to append to
+        :param max_buffer_size: The number of buffered bytes at which the chunks are appended,
+                                defaults to APPENDER_MAX_BUFFER_SIZE
+        :param max_delay: The maximum number of seconds to buffer a chunk before appending it. If
+                          None (default), chunks are only appended when the buffer is full or
+                          when the appender is flushed.
+        :param scheduler: The `PeriodicScheduler` that flushes the appender every `max_delay`
+                          seconds. If None (default), the default scheduler is used.
+        """
+        self._file = file
+        self._max_buffer_size = max_buffer_size
+        self._fd = _get_regular_file_descriptor(file) if hasattr(os, "pwritev") else None
+
+        self._chunks: list[bytes] = []
+        self._buffered_size = 0
+        self._closed = False
+        self._lock = Lock()
+
+        self._flush_task: Optional[ScheduledTask] = None
+        if max_delay is not None:
+            scheduler = scheduler or get_default_scheduler()
+            # The task only holds a weak reference to the appender, so that an appender that isn't
+            # closed can be garbage collected
+            self._flush_task = scheduler.schedule(
+                partial(_flush_batched_appender, weakref.ref(self)),
+                Schedule(max_delay),
+                "BatchedAppender",
+            )
+
+    def __del__(self):
+        # Like a file object, an appender that is garbage collected is closed. The flush task may be
+        # running on this thread, so don't wait for it.
+        if self._flush_task is not None:
+            self._flush_task.cancel(timeout=0)
+
+        with self._lock:
+            self._flush()
+            self._closed = True
+
+    def __enter__(self) -> "BatchedAppender":
+        return self
+
+    def __exit__(self, _exc_type, _exc_value, _traceback):
+        self.close()
+
+    def append(self, chunk: bytes):
+        """
+        Append a chunk of bytes to the file
+
+        :param chunk: The bytes to append. They must not be modified until they are flushed.
+        :raises ValueError: If the appender is closed
+        """
+        with self._lock:
+            if self._closed:
+                raise ValueError("Cannot append to a closed BatchedAppender")
+
+            self._chunks.append(chunk)
+            self._buffered_size += len(chunk)
+            if self._buffered_size >= self._max_buffer_size:
+                self._flush()
+
+    def flush(self):
+        """
+        Append all buffered chunks to the file
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """
+        Append all buffered chunks to the file and stop accepting new chunks
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+
+        with self._lock:
+            self._flush()
+            self._closed = True
+
+    def _flush(self):
+        if not self._chunks:
+            return
+
+        chunks = self._chunks
+        self._chunks = []
+        self._buffered_size = 0
+
+        if self._fd is None:
+            starting_position = self._file.tell()
+            self._file.seek(0, io.SEEK_END)
+            self._file.writelines(chunks)
+            self._file.seek(starting_position, io.SEEK_SET)
+            return
+
+        # Anything that has been written to the file object must reach the file first
+        self._file.flush()
+        offset = os.fstat(self._fd).st_size
+        for i in range(0, len(chunks), _MAX_IOVECS):
+            offset = _pwritev_all(self._fd, chunks[i : i + _MAX_IOVECS], offset)
+
+
+def _flush_batched_appender(appender_ref: "weakref.ref[BatchedAppender]"):
+    appender = appender_ref()
+    if appender is not None:
+        appender.flush()
+
+
+def _pwritev_all(fd: int, buffers: Sequence[Union[bytes, memoryview]], offset: int) -> int:
+    remaining = sum(len(buffer) for buffer in buffers)
+    while True:
+        num_bytes = os.pwritev(fd, buffers, offset)
+        if num_bytes == 0:
+            raise OSError(f"Failed to append {remaining} bytes to file descriptor {fd}")
+
+        offset += num_bytes
+        remaining -= num_bytes
+        if remaining == 0:
+            return offset
+
+        # Skip the buffers that were written completely, and the written part of the next one
+        i = 0
+        while num_bytes >= len(buffers[i]):
+            num_bytes -= len(buffers[i])
+            i += 1
+        buffers = [memoryview(buffers[i])[num_bytes:], *buffers[i + 1 :]]
+
+
+def write_file_atomically(path: Path, contents: bytes):
+    """
+    Replace a file's contents, so that readers see either the old or new contents
+
+    The contents are written to a new file with secure permissions, which then replaces the file.
+
+    :param path: The path of the file to write
+    :param contents: The file's new contents
+    """
+    temp_path = path.with_name(f"{path.name}.{insecure_generate_random_string(8)}.tmp")
+
+    try:
+        with open_new_securely_permissioned_file(str(temp_path), "wb") as f:
+            f.write(contents)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
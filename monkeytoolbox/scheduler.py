@@ -0,0 +1,877 @@
+import asyncio
+import contextlib
+import heapq
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from enum import Enum
+from functools import partial
+from itertools import count
+from threading import Condition, Event, Lock, Thread
+from typing import Any, NamedTuple, Optional
+from weakref import WeakSet
+from collections.abc import Awaitable, Callable, Coroutine
+
+from .threading import create_daemon_thread
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class OverrunPolicy(Enum):
+    """
+    What a fixed-rate schedule does when a call takes longer than the period
+    """
+
+    SKIP = "skip"
+    """Calls that were missed are skipped, and the next call occurs at the next scheduled time"""
+
+    COALESCE = "coalesce"
+    """Calls that were missed are combined into a single call, which occurs immediately"""
+
+    CATCH_UP = "catch_up"
+    """Calls that were missed occur immediately, one after another, until back on schedule"""
+
+
+class CallbackStatus(Enum):
+    """
+    A status that a periodic callback can return to affect when it's next called
+    """
+
+    BUSY = "busy"
+    """The callback could not do its work, for example because a service it uses is overloaded"""
+
+
+class Backoff(NamedTuple):
+    """
+    Exponential backoff for a periodic callback that fails
+
+    A call fails if the callback raises an exception or returns `CallbackStatus.BUSY`. After a call
+    fails, the next call is delayed by the period multiplied by `multiplier`. Each consecutive
+    failure multiplies the delay by `multiplier` again, up to `max_delay`. A call that succeeds
+    restores the normal schedule.
+    """
+
+    max_delay: float
+    """The maximum number of seconds to delay a call by"""
+
+    multiplier: float = 2
+    """The factor by which the delay increases after each consecutive failure"""
+
+
+class Schedule:
+    """
+    Determines when a periodic callback should next be called
+
+    By default, the callback is called `period` seconds after the previous call completes. If
+    `fixed_rate` is True, the callback is instead called every `period` seconds, as measured from
+    the first call, and `overrun_policy` determines what happens to any calls that are missed
+    because a call took longer than `period`. Random jitter of up to `jitter` seconds can be added
+    before each call; jitter does not accumulate. If `backoff` is set, calls are delayed further
+    after a call fails.
+    """
+
+    def __init__(
+        self,
+        period: float,
+        *,
+        fixed_rate: bool = False,
+        overrun_policy: OverrunPolicy = OverrunPolicy.SKIP,
+        jitter: float = 0,
+        backoff: Optional[Backoff] = None,
+    ):
+        self.period = period
+        self.fixed_rate = fixed_rate
+        self.overrun_policy = overrun_policy
+        self.jitter = jitter
+        self.backoff = backoff
+
+    def get_next_call_time(self, scheduled_call_time: float) -> float:
+        """
+        Get the time at which the next call should occur
+
+        This must be called after the previous call completes.
+
+        :param scheduled_call_time: The `time.monotonic()` time that the previous call was
+                                    scheduled for, excluding jitter
+        :return: The `time.monotonic()` time that the next call is scheduled for, excluding jitter
+        """
+        now = time.monotonic()
+        if not self.fixed_rate:
+            return now + self.period
+
+        next_call_time = scheduled_call_time + self.period
+        if next_call_time >= now:
+            return next_call_time
+
+        if self.period <= 0:
+            # There are no whole periods to skip or coalesce, so call again immediately
+            return now
+
+        missed_periods = (now - next_call_time) // self.period
+
+        if self.overrun_policy == OverrunPolicy.SKIP:
+            return next_call_time + (missed_periods + 1) * self.period
+
+        if self.overrun_policy == OverrunPolicy.COALESCE:
+            return next_call_time + missed_periods * self.period
+
+        return next_call_time
+
+    def get_backoff_delay(self, previous_delay: float) -> float:
+        """
+        Get the number of seconds to delay the next call by after a call fails
+
+        :param previous_delay: The delay that was returned for the previous consecutive failure,
+                               or 0 if the previous call succeeded
+        :return: The number of seconds to wait before the next call, excluding jitter
+        """
+        if self.backoff is None:
+            return self.period
+
+        return min(
+            max(previous_delay, self.period) * self.backoff.multiplier, self.backoff.max_delay
+        )
+
+    def get_missed_calls(
+        self, scheduled_call_time: float, start_time: float, end_time: float
+    ) -> int:
+        """
+        Get the number of calls that were missed or delayed because a call took too long
+
+        :param scheduled_call_time: The `time.monotonic()` time that the call was scheduled for,
+                                    excluding jitter
+        :param start_time: The `time.monotonic()` time that the call started
+        :param end_time: The `time.monotonic()` time that the call completed
+        :return: The number of calls that should have started before `end_time`
+        """
+        if self.period <= 0:
+            return 0
+
+        reference_time = scheduled_call_time if self.fixed_rate else start_time
+
+        return max(int((end_time - reference_time) // self.period), 0)
+
+    def get_jitter(self) -> float:
+        """
+        Get a random number of seconds to delay a call by
+        """
+        if not self.jitter:
+            return 0
+
+        return random.uniform(0, self.jitter)  # noqa: DUO102
+
+
+class PeriodicCallStats(NamedTuple):
+    """
+    Statistics about the calls made to a periodic callback
+
+    Lag is the time between when a call was scheduled to start, including jitter, and when it
+    actually started.
+    """
+
+    calls: int
+    """The number of times the callback was called"""
+
+    overruns: int
+    """The number of scheduled calls that were missed or delayed by calls that took too long"""
+
+    last_duration: float
+    """The number of seconds that the most recent call took"""
+
+    mean_duration: float
+    """The mean number of seconds that a call took"""
+
+    max_duration: float
+    """The maximum number of seconds that a call took"""
+
+    last_lag: float
+    """The number of seconds that the most recent call started late"""
+
+    max_lag: float
+    """The maximum number of seconds that a call started late"""
+
+
+class _PeriodicCalls:
+    """
+    Tracks when a periodic callback is due to be called and collects statistics about its calls
+    """
+
+    def __init__(
+        self,
+        schedule: Schedule,
+        name: str,
+        stats_hook: Optional[Callable[[PeriodicCallStats], None]],
+    ):
+        self.name = name
+        self._schedule = schedule
+        self._stats_hook = stats_hook
+
+        self._scheduled_call_time = 0.0
+        self._due_time = 0.0
+        self._backoff_delay = 0.0
+        self._triggered = False
+
+        self._calls = 0
+        self._overruns = 0
+        self._last_duration = 0.0
+        self._total_duration = 0.0
+        self._max_duration = 0.0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+
+    def stats(self) -> PeriodicCallStats:
+        """
+        Get statistics about the calls that have been made to the callback
+
+        Statistics are updated after each call completes, so they may be slightly inconsistent if
+        they are read while a call is completing.
+        """
+        return PeriodicCallStats(
+            calls=self._calls,
+            overruns=self._overruns,
+            last_duration=self._last_duration,
+            mean_duration=self._total_duration / self._calls if self._calls else 0.0,
+            max_duration=self._max_duration,
+            last_lag=self._last_lag,
+            max_lag=self._max_lag,
+        )
+
+    def _set_due_time(self, scheduled_call_time: float, jitter: float):
+        self._scheduled_call_time = scheduled_call_time
+        self._due_time = scheduled_call_time + jitter
+
+    def _set_next_due_time(self, succeeded: bool):
+        if succeeded or self._schedule.backoff is None:
+            self._backoff_delay = 0.0
+            next_call_time = self._schedule.get_next_call_time(self._scheduled_call_time)
+        else:
+            self._backoff_delay = self._schedule.get_backoff_delay(self._backoff_delay)
+            logger.debug(f"Backing off {self.name} for {self._backoff_delay:.3f}s")
+            next_call_time = time.monotonic() + self._backoff_delay
+
+        self._set_due_time(next_call_time, self._schedule.get_jitter())
+
+    def _record_call(self, start_time: float, end_time: float):
+        duration = end_time - start_time
+        lag = max(start_time - self._due_time, 0)
+        missed_calls = self._schedule.get_missed_calls(
+            self._scheduled_call_time, start_time, end_time
+        )
+
+        self._calls += 1
+        self._overruns += missed_calls
+        self._last_duration = duration
+        self._total_duration += duration
+        self._max_duration = max(self._max_duration, duration)
+        self._last_lag = lag
+        self._max_lag = max(self._max_lag, lag)
+
+        if missed_calls:
+            logger.debug(f"{self.name} took {duration:.3f}s and missed {missed_calls} call(s)")
+
+        self._publish_stats()
+
+    def _publish_stats(self):
+        if self._stats_hook is None:
+            return
+
+        try:
+            self._stats_hook(self.stats())
+        except Exception:
+            logger.exception(f"Failed to publish the statistics of {self.name}")
+
+
+class ScheduledTask(_PeriodicCalls):
+    """
+    A callback that is called on a `Schedule`
+
+    Tasks are usually created by `PeriodicScheduler.schedule()`, but can also be run in the
+    foreground by calling `run()`. If the callback returns `CallbackStatus.BUSY` or raises an
+    exception and the schedule has a backoff, the next call is delayed. Calling `trigger()` makes
+    the callback be called as soon as possible.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[], Optional[CallbackStatus]],
+        schedule: Schedule,
+        name: Optional[str] = None,
+        *,
+        inline: bool = False,
+        stats_hook: Optional[Callable[[PeriodicCallStats], None]] = None,
+    ):
+        """
+        :param callback: A callable to be called periodically
+        :param schedule: The schedule to call `callback` on
+        :param name: A human-readable name for the task that will be used in logging
+        :param inline: Whether a `PeriodicScheduler` should call `callback` on its dispatcher
+                       thread rather than a worker thread, defaults to False
+        :param stats_hook: A callable that is passed the task's statistics after each call,
+                           defaults to None
+        """
+        super().__init__(schedule, callback.__name__ if name is None else name, stats_hook)
+        self._callback = callback
+        self._inline = inline
+
+        self._scheduler: Optional[PeriodicScheduler] = None
+        self._heap_seq = -1
+        self._wakeup = Event()
+        self._cancelled = False
+        self._running_thread: Optional[Thread] = None
+        self._idle = Event()
+        self._idle.set()
+
+    def run(self):
+        """
+        Call the callback on schedule in the current thread until the task is cancelled
+
+        The first call occurs immediately. Any exception raised by the callback is propagated,
+        unless the schedule has a backoff, in which case the exception is logged.
+        """
+        self._set_due_time(time.monotonic(), 0)
+        while not self._cancelled:
+            if not self._triggered and self._due_time > time.monotonic():
+                self._wakeup.wait(self._due_time - time.monotonic())
+                self._wakeup.clear()
+                continue
+
+            if self._triggered:
+                self._triggered = False
+                self._set_due_time(time.monotonic(), 0)
+
+            try:
+                succeeded = self._call()
+            except Exception:
+                if self._schedule.backoff is None:
+                    raise
+
+                logger.exception(f"An error occurred while calling {self.name}")
+                succeeded = False
+
+            self._set_next_due_time(succeeded)
+
+    def trigger(self):
+        """
+        Call the callback as soon as possible rather than waiting for its next scheduled call
+
+        If the callback is currently being called, it is called again as soon as the call
+        completes. Any number of triggers before the callback is called result in a single call. The
+        schedule restarts from the triggered call. This method is thread-safe.
+        """
+        if self._scheduler is not None:
+            self._scheduler._trigger(self)
+            return
+
+        self._triggered = True
+        self._wakeup.set()
+
+    def cancel(self, timeout: Optional[float] = None) -> bool:
+        """
+        Prevent any further calls of the callback
+
+        If the callback is currently being called by a `PeriodicScheduler`, this method blocks until
+        it completes, unless it is called from within the callback.
+
+        :param timeout: The maximum number of seconds to wait for the callback to complete. If None
+                        (default), wait indefinitely.
+        :return: True if the callback is not being called, False if the timeout elapsed
+        """
+        self._cancelled = True
+        self._wakeup.set()
+
+        if self._running_thread is threading.current_thread():
+            return True
+
+        return self._idle.wait(timeout)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def _call(self) -> bool:
+        start_time = time.monotonic()
+        try:
+            return self._callback() is not CallbackStatus.BUSY
+        finally:
+            self._record_call(start_time, time.monotonic())
+
+
+class PeriodicScheduler:
+    """
+    Calls many periodic callbacks using a single dispatcher thread
+
+    Rather than each periodic callback having its own thread that spends most of its time waiting,
+    a single dispatcher thread waits until the next callback is due. Callbacks are then called by a
+    bounded pool of worker threads, so that a slow callback does not delay the others. Callbacks
+    that are known to be quick can be called directly by the dispatcher thread by setting `inline`
+    to True when they are scheduled. A callback is never called concurrently with itself.
+
+    If a callback raises an exception, the exception is logged and the callback continues to be
+    called on schedule. The dispatcher and worker threads are daemon threads that are started the
+    first time they're needed, and are stopped by `shutdown()`.
+
+    The scheduler's threads do not survive a fork. In the child process, the tasks that were
+    scheduled by the parent are cancelled, so that they are not called by both processes, and new
+    tasks can be scheduled.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, name: str = "PeriodicScheduler"):
+        """
+        :param max_workers: The maximum number of worker threads, defaults to DEFAULT_MAX_WORKERS
+        :param name: A name for this scheduler that will be used to name its threads
+        """
+        self._name = name
+
+        self._heap: list[tuple[float, int, ScheduledTask]] = []
+        self._running_tasks: set[ScheduledTask] = set()
+        self._counter = count()
+        self._condition = Condition()
+        self._dispatcher: Optional[Thread] = None
+        self._shutdown = False
+
+        self._max_workers = max_workers
+        self._workers = _WorkerPool(max_workers, f"{name}-worker")
+
+        _schedulers.add(self)
+
+    def schedule(
+        self,
+        callback: Callable[[], Optional[CallbackStatus]],
+        schedule: Schedule,
+        name: Optional[str] = None,
+        *,
+        inline: bool = False,
+        stats_hook: Optional[Callable[[PeriodicCallStats], None]] = None,
+    ) -> ScheduledTask:
+        """
+        Periodically call a callback
+
+        The first call occurs immediately.
+
+        :param callback: A callable to be called periodically
+        :param schedule: The schedule to call `callback` on
+        :param name: A human-readable name for the task that will be used in logging
+        :param inline: Whether to call `callback` on the dispatcher thread rather than a worker
+                       thread, defaults to False. Only use this for callbacks that return quickly.
+        :param stats_hook: A callable that is passed the task's statistics after each call,
+                           defaults to None
+        :return: A `ScheduledTask` that can be used to cancel further calls
+        :raises RuntimeError: If the scheduler has been shut down
+        """
+        task = ScheduledTask(callback, schedule, name, inline=inline, stats_hook=stats_hook)
+        task._scheduler = self
+
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError(f"Cannot schedule new tasks after {self._name} is shut down")
+
+            task._set_due_time(time.monotonic(), 0)
+            self._push(task)
+            self._start_dispatcher()
+
+        return task
+
+    def shutdown(self, wait: bool = True):
+        """
+        Cancel all tasks and stop the scheduler's threads
+
+        Calls that are in progress are allowed to complete. No new tasks can be scheduled once the
+        scheduler is shut down. This method can be called from within a callback, in which case it
+        does not wait for the calling thread.
+
+        :param wait: Whether to wait for calls that are in progress to complete and for the threads
+                     to stop, defaults to True
+        """
+        logger.debug(f"Shutting down {self._name}")
+
+        with self._condition:
+            self._shutdown = True
+            self._cancel_all_tasks()
+            self._condition.notify()
+
+            dispatcher = self._dispatcher
+
+        # The dispatcher stops the workers when it exits, so that nothing is submitted to them
+        # afterwards. If this is called by an inline callback, the dispatcher exits once it returns.
+        if not wait or dispatcher is threading.current_thread():
+            return
+
+        if dispatcher is not None:
+            dispatcher.join()
+        self._workers.join()
+
+    def _cancel_all_tasks(self):
+        # Must be called while holding self._condition
+        for task in [entry[2] for entry in self._heap] + list(self._running_tasks):
+            task._cancelled = True
+            task._wakeup.set()
+
+        self._heap.clear()
+
+    def _reset_after_fork(self):
+        # Only the thread that called fork() exists in the child process, so the scheduler's locks
+        # may have been held by threads that no longer exist, and calls that were in progress
+        # will never complete
+        for task in self._running_tasks:
+            task._running_thread = None
+            task._idle.set()
+        self._cancel_all_tasks()
+        self._running_tasks.clear()
+
+        self._condition = Condition()
+        self._dispatcher = None
+        self._workers = _WorkerPool(self._max_workers, f"{self._name}-worker")
+
+    def _push(self, task: ScheduledTask):
+        # Must be called while holding self._condition. Any entry that was previously pushed for
+        # the task becomes stale and is discarded when it reaches the top of the heap.
+        task._heap_seq = next(self._counter)
+        heapq.heappush(self._heap, (task._due_time, task._heap_seq, task))
+        self._condition.notify()
+
+    def _trigger(self, task: ScheduledTask):
+        with self._condition:
+            if self._shutdown or task.cancelled or task._triggered:
+                return
+
+            task._triggered = True
+
+            # If the task is being called, it is rescheduled when the call completes
+            if task._idle.is_set():
+                task._set_due_time(time.monotonic(), 0)
+                self._push(task)
+
+    def _start_dispatcher(self):
+        if self._dispatcher is None:
+            self._dispatcher = create_daemon_thread(
+                target=self._dispatch, name=f"{self._name}-dispatcher"
+            )
+            self._dispatcher.start()
+
+    def _dispatch(self):
+        while (task := self._wait_for_next_task()) is not None:
+            if task._inline:
+                self._call(task)
+            else:
+                self._workers.submit(partial(self._call, task))
+
+        self._workers.shutdown()
+        logger.debug(f"{self._name} has shut down")
+
+    def _wait_for_next_task(self) -> Optional[ScheduledTask]:
+        with self._condition:
+            while True:
+                if self._shutdown:
+                    return None
+
+                while self._heap and self._is_stale(*self._heap[0]):
+                    heapq.heappop(self._heap)
+
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+
+                task = heapq.heappop(self._heap)[2]
+                task._idle.clear()
+                task._triggered = False
+                self._running_tasks.add(task)
+
+                return task
+
+    @staticmethod
+    def _is_stale(_: float, heap_seq: int, task: ScheduledTask) -> bool:
+        return task.cancelled or heap_seq != task._heap_seq
+
+    def _call(self, task: ScheduledTask):
+        task._running_thread = threading.current_thread()
+        succeeded = False
+        try:
+            if not task.cancelled:
+                succeeded = task._call()
+        except Exception:
+            logger.exception(f"An error occurred while calling {task.name}")
+        finally:
+            task._running_thread = None
+            self._reschedule(task, succeeded)
+
+    def _reschedule(self, task: ScheduledTask, succeeded: bool):
+        with self._condition:
+            self._running_tasks.discard(task)
+            task._idle.set()
+
+            if self._shutdown or task.cancelled:
+                return
+
+            if task._triggered:
+                task._set_due_time(time.monotonic(), 0)
+            else:
+                task._set_next_due_time(succeeded)
+
+            self._push(task)
+
+
+class _WorkerPool:
+    """
+    A bounded pool of daemon threads that are started as they're needed
+    """
+
+    def __init__(self, max_workers: int, name_prefix: str):
+        self._max_workers = max_workers
+        self._name_prefix = name_prefix
+
+        self._queue: queue.SimpleQueue[Optional[Callable[[], None]]] = queue.SimpleQueue()
+        self._lock = Lock()
+        self._threads: list[Thread] = []
+        self._num_idle_workers = 0
+
+    def submit(self, fn: Callable[[], None]):
+        with self._lock:
+            if self._num_idle_workers > 0:
+                self._num_idle_workers -= 1
+            elif len(self._threads) < self._max_workers:
+                thread = create_daemon_thread(
+                    target=self._work, name=f"{self._name_prefix}-{len(self._threads) + 1:02d}"
+                )
+                self._threads.append(thread)
+                thread.start()
+
+            self._queue.put(fn)
+
+    def shutdown(self):
+        """
+        Stop each worker once it has finished the functions that were submitted before this call
+        """
+        with self._lock:
+            for _ in self._threads:
+                self._queue.put(None)
+
+    def join(self):
+        with self._lock:
+            threads = list(self._threads)
+
+        for thread in threads:
+            if thread is not threading.current_thread():
+                thread.join()
+
+    def _work(self):
+        while (fn := self._queue.get()) is not None:
+            fn()
+
+            with self._lock:
+                self._num_idle_workers += 1
+
+
+_schedulers: WeakSet[PeriodicScheduler] = WeakSet()
+
+
+def _reset_schedulers_after_fork():
+    for scheduler in _schedulers:
+        scheduler._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_schedulers_after_fork)
+
+_default_scheduler: Optional[PeriodicScheduler] = None
+_default_scheduler_lock = Lock()
+
+
+def get_default_scheduler() -> PeriodicScheduler:
+    """
+    Get the `PeriodicScheduler` that is shared by all `PeriodicCaller`s by default
+    """
+    global _default_scheduler
+
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = PeriodicScheduler()
+
+        return _default_scheduler
+
+
+class AsyncPeriodicCaller(_PeriodicCalls):
+    """
+    Periodically calls a coroutine function
+
+    This is the asyncio counterpart of `PeriodicCaller`. The calls can occur in a task on the
+    running event loop by calling the `start()` method, or by awaiting the `run()` method. By
+    default, the callback is called `period` seconds after the previous call completes, so calls
+    never occur concurrently. The `fixed_rate`, `overrun_policy`, `jitter`, `backoff`, and
+    `stats_hook` parameters, `trigger()`, and `stats()` behave as they do for `PeriodicCaller`.
+
+    `stop()` waits for a call that is in progress to complete. If the timeout elapses or the task
+    that awaits `stop()` is cancelled, the call is cancelled instead.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[], Awaitable[Optional[CallbackStatus]]],
+        period: float,
+        name: Optional[str] = None,
+        *,
+        fixed_rate: bool = False,
+        overrun_policy: OverrunPolicy = OverrunPolicy.SKIP,
+        jitter: float = 0,
+        backoff: Optional[Backoff] = None,
+        stats_hook: Optional[Callable[[PeriodicCallStats], None]] = None,
+    ):
+        """
+        :param callback: A coroutine function to be called periodically
+        :param period: The time to wait between calls of `callback`.
+        :param name: A human-readable name for this caller that will be used in debug logging
+        :param fixed_rate: Whether to call `callback` every `period` seconds rather than waiting
+                           `period` seconds after each call completes, defaults to False
+        :param overrun_policy: What to do with calls that are missed because a call took longer
+                               than `period`. Only used if `fixed_rate` is True. Defaults to
+                               `OverrunPolicy.SKIP`.
+        :param jitter: The maximum number of seconds of random delay to add before each call,
+                       defaults to 0
+        :param backoff: How to delay calls after the callback fails, defaults to None
+        :param stats_hook: A callable that is passed this component's statistics after each call,
+                           defaults to None
+        """
+        super().__init__(
+            Schedule(
+                period,
+                fixed_rate=fixed_rate,
+                overrun_policy=overrun_policy,
+                jitter=jitter,
+                backoff=backoff,
+            ),
+            f"AsyncPeriodicCaller-{callback.__name__}" if name is None else name,
+            stats_hook,
+        )
+        self._callback = callback
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    def start(self):
+        """
+        Periodically call the callback in a task on the running event loop
+
+        If the callback raises an exception, the exception is logged and the callback continues to
+        be called.
+        """
+        logger.debug(f"Starting {self.name}")
+
+        self._reset()
+        self._task = asyncio.get_running_loop().create_task(
+            self._run(log_exceptions=True), name=self.name
+        )
+
+    def run(self) -> Coroutine[Any, Any, None]:
+        """
+        Periodically call the callback and return when `stop()` is called
+
+        The returned coroutine must be awaited. If `stop()` is called before it first runs, it
+        returns without calling the callback.
+
+        Any exception raised by the callback is propagated, unless `backoff` is set, in which case
+        the exception is logged.
+        """
+        # The state is reset before the coroutine is returned, rather than when it first runs, so
+        # that a call to stop() in the meantime is not undone
+        self._reset()
+        return self._run(log_exceptions=False)
+
+    def _reset(self):
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._set_due_time(time.monotonic(), 0)
+
+    async def _run(self, log_exceptions: bool):
+        self._loop = asyncio.get_running_loop()
+
+        logger.debug(f"Successfully started {self.name}")
+        try:
+            while not self._stopping:
+                if not self._triggered and self._due_time > time.monotonic():
+                    await self._wait(self._due_time - time.monotonic())
+                    continue
+
+                if self._triggered:
+                    self._triggered = False
+                    self._set_due_time(time.monotonic(), 0)
+
+                succeeded = await self._call(log_exceptions or self._schedule.backoff is not None)
+                self._set_next_due_time(succeeded)
+        finally:
+            self._loop = None
+            logger.debug(f"Successfully stopped {self.name}")
+
+    async def _wait(self, timeout: float):
+        with contextlib.suppress(TimeoutError):
+            async with asyncio.timeout(timeout):
+                await self._wakeup.wait()
+
+        self._wakeup.clear()
+
+    async def _call(self, log_exceptions: bool) -> bool:
+        start_time = time.monotonic()
+        try:
+            return await self._callback() is not CallbackStatus.BUSY
+        except Exception:
+            if not log_exceptions:
+                raise
+
+            logger.exception(f"An error occurred while calling {self.name}")
+            return False
+        finally:
+            self._record_call(start_time, time.monotonic())
+
+    def trigger(self):
+        """
+        Call the callback as soon as possible rather than waiting for its next scheduled call
+
+        If the callback is currently being called, it is called again as soon as the call
+        completes. Any number of triggers before the callback is called result in a single call.
+        This method is thread-safe and does nothing if this component is not running.
+        """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._trigger)
+
+    def _trigger(self):
+        self._triggered = True
+        self._wakeup.set()
+
+    async def stop(self, timeout: Optional[float] = None):
+        """
+        Stop this component from making any further calls
+
+        When the timeout argument is not present or None, the operation will wait until the
+        AsyncPeriodicCaller stops.
+
+        :param timeout: The number of seconds to wait for a call that is in progress to complete
+                        before cancelling it
+        """
+        logger.debug(f"Stopping {self.name}")
+
+        self._stopping = True
+        self._wakeup.set()
+
+        task = self._task
+        if task is None or task.done() or task is asyncio.current_task():
+            return
+
+        try:
+            async with asyncio.timeout(timeout):
+                await asyncio.shield(task)
+        except TimeoutError:
+            logger.warning(f"Timed out waiting for {self.name} to stop")
+            task.cancel()
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
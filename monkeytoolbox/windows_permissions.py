@@ -27,6 +27,38 @@ def get_security_descriptor_for_owner_only_permissions():
     return security_descriptor
 
 
+def has_owner_only_permissions(path: str) -> bool:
+    """
+    Check whether a file is owned by the current user and no one else is allowed to access it
+
+    :param path: The path of the file to check
+    :return: True if only the current user can access the file, False otherwise
+    """
+    user_sid = _get_user_pySID_object()
+    security_descriptor = win32security.GetFileSecurity(
+        path, win32security.OWNER_SECURITY_INFORMATION | win32security.DACL_SECURITY_INFORMATION
+    )
+
+    if security_descriptor.GetSecurityDescriptorOwner() != user_sid:
+        return False
+
+    dacl = security_descriptor.GetSecurityDescriptorDacl()
+    if dacl is None:
+        # A NULL DACL allows everyone to access the file
+        return False
+
+    for i in range(dacl.GetAceCount()):
+        ace = dacl.GetAce(i)
+        ace_type, sid = ace[0][0], ace[-1]
+        if ace_type == ntsecuritycon.ACCESS_DENIED_ACE_TYPE:
+            continue
+
+        if ace_type != ntsecuritycon.ACCESS_ALLOWED_ACE_TYPE or sid != user_sid:
+            return False
+
+    return True
+
+
 def _get_user_pySID_object():
     # Note: We do this using the process handle and token instead of by account name, as some SIDs
     # have no corresponding account name, such as a logon SID that identifies a logon session. This
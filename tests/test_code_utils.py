@@ -1,14 +1,33 @@
-from queue import Queue
+import multiprocessing
+import os
+import string
+import time
+from collections import Counter
+from itertools import islice
+from queue import Queue, SimpleQueue
+from threading import Event, Thread, Timer
+from typing import Any
 from collections.abc import Callable
 
 import pytest
 
 from monkeytoolbox import (
+    Backoff,
+    CallbackStatus,
+    OverrunPolicy,
+    PeriodicCaller,
+    PeriodicCallStats,
+    SecureRandomStringGenerator,
     apply_filters,
+    apply_vectorized_filters,
     del_key,
+    drain_queue,
     insecure_generate_random_string,
+    insecure_generate_unique_random_strings,
+    iter_queue_batches,
     queue_to_list,
     secure_generate_random_string,
+    secure_generate_random_strings,
 )
 
 
@@ -29,6 +48,101 @@ def test_apply_filters__no_filters_provided():
     assert list(filtered_iterable) == iterable
 
 
+@pytest.mark.parametrize("n", [0, 1, 99, 100, 101, 10100, 25000])
+def test_apply_filters__adaptive(n):
+    iterable = range(n)
+    filters = [lambda x: x % 2 == 0, lambda x: x > 2, lambda x: x % 3 != 0]
+    expected = [x for x in iterable if all(f(x) for f in filters)]
+
+    filtered_iterable = apply_filters(filters, iterable, adaptive=True)
+
+    assert list(filtered_iterable) == expected
+
+
+def test_apply_filters__adaptive_no_filters_provided():
+    iterable = list(range(150))
+
+    filtered_iterable = apply_filters([], iterable, adaptive=True)
+
+    assert list(filtered_iterable) == iterable
+
+
+def test_apply_filters__adaptive_reorders_filters():
+    num_items = 10000
+    num_calls = {"unselective": 0, "selective": 0}
+
+    def unselective(x):
+        num_calls["unselective"] += 1
+        return True
+
+    def selective(x):
+        num_calls["selective"] += 1
+        return x % 10 == 0
+
+    filtered_iterable = apply_filters([unselective, selective], range(num_items), adaptive=True)
+
+    assert len(list(filtered_iterable)) == num_items / 10
+    assert num_calls["selective"] == num_items
+    assert num_calls["unselective"] < num_items / 5
+
+
+@pytest.fixture(params=["numpy", "no_numpy"])
+def vectorize(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr("monkeytoolbox.code_utils.np", None)
+
+
+def test_apply_vectorized_filters(vectorize):
+    batches = [range(0, 10), [], range(10, 20), range(21, 30, 2)]
+    filters = [lambda x: x % 2 == 0, lambda x: x > 2, lambda x: x != 6]
+
+    filtered_batches = apply_vectorized_filters(filters, batches)
+
+    assert [list(b) for b in filtered_batches] == [[4, 8], [10, 12, 14, 16, 18]]
+
+
+def test_apply_vectorized_filters__no_filters_provided(vectorize):
+    batches = [range(0, 5), range(5, 10)]
+
+    filtered_batches = apply_vectorized_filters([], batches)
+
+    assert [list(b) for b in filtered_batches] == [list(b) for b in batches]
+
+
+def test_apply_vectorized_filters__bitwise_operators(vectorize):
+    batches = [[0x0A000001, 0xC0A80001, 0x0A0000FF]]
+    filters = [lambda ip: (ip >> 24) == 10, lambda ip: ~(ip & 0xFF) & 0x80]
+
+    filtered_batches = apply_vectorized_filters(filters, batches)
+
+    assert [list(b) for b in filtered_batches] == [[0x0A000001]]
+
+
+def test_apply_vectorized_filters__negated_conditions(vectorize):
+    batches = [range(1020, 1030)]
+    filters = [lambda port: port >= 1024, lambda port: (port % 2 == 1) ^ True]
+
+    filtered_batches = apply_vectorized_filters(filters, batches)
+
+    assert [list(b) for b in filtered_batches] == [[1024, 1026, 1028]]
+
+
+def test_apply_vectorized_filters__short_circuits_empty_batch():
+    np = pytest.importorskip("numpy")
+    calls = []
+
+    def record_call(array):
+        calls.append(len(array))
+        return np.ones(len(array), dtype=bool)
+
+    filtered_batches = apply_vectorized_filters([lambda a: a > 100, record_call], [range(10)])
+
+    assert list(filtered_batches) == []
+    assert calls == []
+
+
 def test_empty_queue_to_empty_list():
     q: Queue = Queue()
 
@@ -48,6 +162,94 @@ def test_queue_to_list():
     assert list_ == expected_list
 
 
+def test_queue_to_list__multiprocessing_queue():
+    expected_list = [8, 6, 7, 5, 3, 0, 9]
+    q: multiprocessing.Queue = multiprocessing.Queue()
+    for i in expected_list:
+        q.put(i)
+
+    # The queue's feeder thread sends the items in the background
+    list_: list[Any] = []
+    deadline = time.monotonic() + 5
+    while len(list_) < len(expected_list):
+        assert time.monotonic() < deadline
+        list_.extend(queue_to_list(q))  # type: ignore [arg-type]
+
+    assert list_ == expected_list
+
+
+@pytest.mark.parametrize("max_items, expected_items", [(None, [0, 1, 2]), (2, [0, 1])])
+def test_drain_queue__simple_queue(max_items, expected_items):
+    q: SimpleQueue = SimpleQueue()
+    for i in range(3):
+        q.put(i)
+
+    assert drain_queue(q, max_items=max_items) == expected_items  # type: ignore [arg-type]
+
+
+def test_drain_queue__simple_queue_linger():
+    q: SimpleQueue = SimpleQueue()
+    timer = Timer(0.01, lambda: q.put(1))
+    timer.start()
+
+    assert drain_queue(q, linger=5) == [1]  # type: ignore [arg-type]
+    timer.join()
+
+
+def test_drain_queue__max_items():
+    q: Queue = Queue()
+    for i in range(10):
+        q.put(i)
+
+    assert drain_queue(q, max_items=4) == [0, 1, 2, 3]
+    assert drain_queue(q, max_items=4) == [4, 5, 6, 7]
+    assert drain_queue(q, max_items=4) == [8, 9]
+    assert drain_queue(q, max_items=4) == []
+
+
+def test_drain_queue__linger_waits_for_first_item():
+    q: Queue = Queue()
+    timer = Timer(0.01, lambda: q.put(1))
+    timer.start()
+
+    assert drain_queue(q, linger=5) == [1]
+    timer.join()
+
+
+def test_drain_queue__linger_timeout():
+    q: Queue = Queue()
+
+    start = time.monotonic()
+    assert drain_queue(q, linger=0.01) == []
+    assert time.monotonic() - start >= 0.01
+
+
+def test_drain_queue__unblocks_producers():
+    q: Queue = Queue(maxsize=2)
+    q.put(0)
+    q.put(1)
+    producer = Thread(target=q.put, args=(2,))
+    producer.start()
+
+    assert drain_queue(q) == [0, 1]
+    producer.join(timeout=1)
+
+    assert not producer.is_alive()
+    assert drain_queue(q) == [2]
+
+
+def test_iter_queue_batches():
+    q: Queue = Queue()
+    for i in range(7):
+        q.put(i)
+
+    assert list(iter_queue_batches(q, max_items=3)) == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_iter_queue_batches__empty_queue():
+    assert list(iter_queue_batches(Queue(), max_items=3, linger=0.001)) == []
+
+
 def test_del_key__deletes_key():
     key_to_delete = "a"
     my_dict = {"a": 1, "b": 2}
@@ -103,3 +305,371 @@ def test_character_set():
 
     for c in random_str:
         assert c in character_set
+
+
+@pytest.mark.parametrize("n, character_set", [(0, "abc"), (1, "a"), (3, "ab"), (4, "abcde")])
+def test_insecure_generate_unique_random_strings__exhaustive(n, character_set):
+    strings = list(insecure_generate_unique_random_strings(n, character_set))
+
+    assert len(strings) == len(character_set) ** n
+    assert len(set(strings)) == len(strings)
+    assert all(len(s) == n and set(s) <= set(character_set) for s in strings)
+
+
+def test_insecure_generate_unique_random_strings__unique():
+    strings = list(islice(insecure_generate_unique_random_strings(8), 10000))
+
+    assert len(set(strings)) == len(strings)
+
+
+def test_insecure_generate_unique_random_strings__duplicate_characters():
+    strings = list(insecure_generate_unique_random_strings(3, "aab"))
+
+    assert len(strings) == 2**3
+    assert len(set(strings)) == len(strings)
+
+
+def test_insecure_generate_unique_random_strings__seed():
+    strings_1 = list(islice(insecure_generate_unique_random_strings(8, seed=42), 100))
+    strings_2 = list(islice(insecure_generate_unique_random_strings(8, seed=42), 100))
+    strings_3 = list(islice(insecure_generate_unique_random_strings(8, seed=43), 100))
+
+    assert strings_1 == strings_2
+    assert strings_1 != strings_3
+
+
+@pytest.mark.parametrize("n, character_set", [(-1, "abc"), (8, "")])
+def test_insecure_generate_unique_random_strings__invalid_arguments(n, character_set):
+    with pytest.raises(ValueError):
+        insecure_generate_unique_random_strings(n, character_set)
+
+
+@pytest.mark.parametrize(
+    "character_set",
+    ["abcde", "a", "αβγ", string.printable, "".join(chr(0x4E00 + i) for i in range(300))],
+)
+def test_secure_generate_random_string__character_set(character_set):
+    n = 1000
+
+    random_str = secure_generate_random_string(n=n, character_set=character_set)
+
+    assert len(random_str) == n
+    assert set(random_str) <= set(character_set)
+
+
+def test_secure_random_string_generator__uniform():
+    # 3 does not divide 256, so a naive modulo would make "a" more likely than "c"
+    generator = SecureRandomStringGenerator("abc")
+    n = 300000
+
+    counts = Counter(generator.generate(n))
+
+    for c in "abc":
+        assert abs(counts[c] - n / 3) < n / 100
+
+
+def test_secure_random_string_generator__small_block_size():
+    generator = SecureRandomStringGenerator(block_size=1)
+
+    assert len(generator.generate(5000)) == 5000
+
+
+def test_secure_random_string_generator__empty_character_set():
+    with pytest.raises(ValueError):
+        SecureRandomStringGenerator("")
+
+
+@pytest.mark.parametrize("n", [0, 1, 16])
+def test_secure_generate_random_strings(n):
+    strings = secure_generate_random_strings(100, n)
+
+    assert len(strings) == 100
+    assert all(len(s) == n for s in strings)
+
+
+def test_secure_generate_random_strings__unique():
+    strings = secure_generate_random_strings(1000, 32)
+
+    assert len(set(strings)) == 1000
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork()")
+def test_secure_random_string_generator__fork():
+    generator = SecureRandomStringGenerator()
+    generator.generate(1)
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_fd, generator.generate(32).encode())
+        os._exit(0)
+
+    os.waitpid(pid, 0)
+    child_str = os.read(read_fd, 32).decode()
+    os.close(read_fd)
+    os.close(write_fd)
+
+    assert child_str != generator.generate(32)
+
+
+PERIOD = 0.05
+TOLERANCE = 0.02
+
+
+def run_periodic_caller(num_calls: int, call_durations: list[float] = [], **kwargs) -> list[float]:
+    """
+    Run a PeriodicCaller until its callback has been called `num_calls` times
+
+    :return: The time of each call, relative to the first call
+    """
+    call_times: list[float] = []
+    done = Event()
+
+    def callback():
+        call_times.append(time.monotonic())
+        if len(call_times) <= len(call_durations):
+            time.sleep(call_durations[len(call_times) - 1])
+        if len(call_times) >= num_calls:
+            done.set()
+
+    caller = PeriodicCaller(callback, PERIOD, **kwargs)
+    caller.start()
+    assert done.wait(timeout=5)
+    caller.stop()
+
+    return [t - call_times[0] for t in call_times[:num_calls]]
+
+
+def test_periodic_caller__fixed_delay():
+    call_times = run_periodic_caller(4, [PERIOD / 2] * 3)
+
+    # Each wait starts after the previous call completes
+    assert call_times[3] >= 3 * (PERIOD + PERIOD / 2)
+
+
+def test_periodic_caller__fixed_rate():
+    call_times = run_periodic_caller(6, [PERIOD / 2] * 5, fixed_rate=True)
+
+    for i, t in enumerate(call_times):
+        assert t == pytest.approx(i * PERIOD, abs=TOLERANCE)
+
+
+@pytest.mark.parametrize(
+    "overrun_policy, expected_call_times",
+    [
+        # The first call overruns by 2.5 periods and completes at 3.5 periods
+        (OverrunPolicy.SKIP, [0, 4, 5]),
+        (OverrunPolicy.COALESCE, [0, 3.5, 4, 5]),
+        (OverrunPolicy.CATCH_UP, [0, 3.5, 3.5, 3.5, 4, 5]),
+    ],
+)
+def test_periodic_caller__fixed_rate_overrun(overrun_policy, expected_call_times):
+    call_times = run_periodic_caller(
+        len(expected_call_times),
+        [3.5 * PERIOD],
+        fixed_rate=True,
+        overrun_policy=overrun_policy,
+    )
+
+    assert call_times == pytest.approx([t * PERIOD for t in expected_call_times], abs=TOLERANCE)
+
+
+def test_periodic_caller__jitter():
+    call_times = run_periodic_caller(5, fixed_rate=True, jitter=PERIOD / 2)
+
+    # Jitter delays calls, but does not accumulate. Times are relative to the first call, which
+    # may itself start late.
+    for i, t in enumerate(call_times):
+        assert i * PERIOD - TOLERANCE <= t <= i * PERIOD + PERIOD / 2 + TOLERANCE
+
+
+def test_periodic_caller__stats_before_start():
+    caller = PeriodicCaller(lambda: None, PERIOD)
+
+    assert caller.stats() == PeriodicCallStats(0, 0, 0.0, 0.0, 0.0, 0.0, 0.0)
+
+
+def test_periodic_caller__stats():
+    published_stats: list[PeriodicCallStats] = []
+    done = Event()
+
+    def callback():
+        time.sleep(PERIOD / 2)
+        if len(published_stats) >= 2:
+            done.set()
+
+    caller = PeriodicCaller(callback, PERIOD, stats_hook=published_stats.append)
+    caller.start()
+    assert done.wait(timeout=5)
+    caller.stop()
+    stats = caller.stats()
+
+    assert [s.calls for s in published_stats] == list(range(1, stats.calls + 1))
+    assert stats.overruns == 0
+    assert stats.last_duration == pytest.approx(PERIOD / 2, abs=TOLERANCE)
+    assert stats.mean_duration == pytest.approx(PERIOD / 2, abs=TOLERANCE)
+    assert stats.max_duration >= stats.mean_duration
+    assert 0 <= stats.last_lag <= stats.max_lag < TOLERANCE
+
+
+def test_periodic_caller__stats_overruns():
+    stats_hook_calls: list[PeriodicCallStats] = []
+
+    call_times = run_periodic_caller(
+        3,
+        [3.5 * PERIOD],
+        fixed_rate=True,
+        overrun_policy=OverrunPolicy.COALESCE,
+        stats_hook=stats_hook_calls.append,
+    )
+
+    assert len(call_times) == 3
+    assert stats_hook_calls[0].overruns == 3
+    assert stats_hook_calls[0].max_duration >= 3.5 * PERIOD
+    # The coalesced call was scheduled for 3 periods, but started at 3.5 periods
+    assert stats_hook_calls[1].last_lag == pytest.approx(PERIOD / 2, abs=TOLERANCE)
+
+
+def test_periodic_caller__stats_hook_raises_exception():
+    calls: list[int] = []
+
+    def stats_hook(_):
+        raise Exception("failed")
+
+    def callback():
+        calls.append(1)
+        if len(calls) >= 2:
+            caller.stop()
+
+    caller = PeriodicCaller(callback, PERIOD, stats_hook=stats_hook)
+    caller.run()
+
+    assert caller.stats().calls == 2
+
+
+def run_failing_periodic_caller(results: list[Any], **kwargs) -> list[float]:
+    """
+    Run a PeriodicCaller whose callback returns or raises each of `results` in turn
+
+    :return: The time of each call, relative to the first call
+    """
+    call_times: list[float] = []
+    done = Event()
+
+    def callback():
+        call_times.append(time.monotonic())
+        if len(call_times) > len(results):
+            done.set()
+            return None
+
+        result = results[len(call_times) - 1]
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+    caller = PeriodicCaller(callback, PERIOD, **kwargs)
+    caller.start()
+    assert done.wait(timeout=5)
+    caller.stop()
+
+    return [t - call_times[0] for t in call_times[: len(results) + 1]]
+
+
+@pytest.mark.parametrize("failure", [Exception("failed"), CallbackStatus.BUSY])
+def test_periodic_caller__backoff(failure):
+    call_times = run_failing_periodic_caller(
+        [failure, failure, failure, None], backoff=Backoff(max_delay=4 * PERIOD)
+    )
+
+    # Delays of 2, 4, and 4 (capped) periods, then back to normal
+    assert call_times == pytest.approx(
+        [0, 2 * PERIOD, 6 * PERIOD, 10 * PERIOD, 11 * PERIOD], abs=TOLERANCE
+    )
+
+
+@pytest.mark.parametrize("failure", [Exception("failed"), CallbackStatus.BUSY])
+def test_periodic_caller__no_backoff(failure):
+    call_times = run_failing_periodic_caller([failure, failure])
+
+    assert call_times == pytest.approx([0, PERIOD, 2 * PERIOD], abs=TOLERANCE)
+
+
+def test_periodic_caller__backoff_in_foreground():
+    calls: list[int] = []
+
+    def callback():
+        calls.append(1)
+        if len(calls) >= 2:
+            caller.stop()
+        raise Exception("failed")
+
+    caller = PeriodicCaller(callback, PERIOD, backoff=Backoff(max_delay=PERIOD))
+    caller.run()
+
+    assert len(calls) == 2
+
+
+def test_periodic_caller__trigger_before_start():
+    caller = PeriodicCaller(lambda: None, PERIOD)
+
+    caller.trigger()
+
+
+def test_periodic_caller__trigger():
+    calls: list[int] = []
+
+    caller = PeriodicCaller(lambda: calls.append(1), 10)
+    caller.start()
+    wait_until(lambda: len(calls) == 1)
+    for _ in range(100):
+        caller.trigger()
+    wait_until(lambda: len(calls) == 2)
+    time.sleep(PERIOD)
+    caller.stop()
+
+    assert len(calls) == 2
+
+
+def test_periodic_caller__trigger_during_call():
+    calls: list[int] = []
+    release = Event()
+
+    def callback():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+
+    caller = PeriodicCaller(callback, 10)
+    caller.start()
+    wait_until(lambda: len(calls) == 1)
+    for _ in range(10):
+        caller.trigger()
+    release.set()
+    wait_until(lambda: len(calls) == 2)
+    time.sleep(PERIOD)
+    caller.stop()
+
+    assert len(calls) == 2
+
+
+def test_periodic_caller__trigger_in_foreground():
+    calls: list[int] = []
+
+    def callback():
+        calls.append(1)
+        if len(calls) >= 2:
+            caller.stop()
+
+    caller = PeriodicCaller(callback, 10)
+    Timer(PERIOD, caller.trigger).start()
+    caller.run()
+
+    assert len(calls) == 2
+
+
+def wait_until(condition: Callable[[], bool], timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
@@ -1,6 +1,17 @@
+import asyncio
+import stat
 import time
+from pathlib import Path
+from threading import Event, Thread, current_thread
+from typing import Any
+from collections.abc import Callable
 
-from monkeytoolbox import request_cache
+import pytest
+from monkeytypes import OperatingSystem
+
+from monkeytoolbox import RequestCacheInfo, get_os, request_cache
+from monkeytoolbox.decorators import _persist_request_caches
+from tests.utils import assert_linux_permissions
 
 TTL = 10
 
@@ -40,3 +51,733 @@ def test_request_cache__clear_cache(freezer):
 
     assert t1 == t2
     assert t1 != t3
+
+
+def test_request_cache__keyed(freezer):
+    @request_cache(TTL, keyed=True)
+    def make_request(host, port=80):
+        return (host, port, time.perf_counter_ns())
+
+    a1 = make_request("a")
+    b1 = make_request("b")
+    a_443 = make_request("a", port=443)
+    freezer.tick()
+    a2 = make_request("a")
+    b2 = make_request("b")
+
+    assert a1 == a2
+    assert b1 == b2
+    assert a1 != b1
+    assert a_443[:2] == ("a", 443)
+
+
+def test_request_cache__keyed_per_entry_ttl(freezer):
+    @request_cache(TTL, keyed=True)
+    def make_request(host):
+        return time.perf_counter_ns()
+
+    # t=0
+    a1 = make_request("a")
+    freezer.tick(TTL - 1)
+    # t=TTL-1
+    b1 = make_request("b")
+    freezer.tick(2)
+    # t=TTL+1 -- "a" has expired, but "b" has not
+    a2 = make_request("a")
+    b2 = make_request("b")
+
+    assert a1 != a2
+    assert b1 == b2
+
+
+def test_request_cache__keyed_maxsize_evicts_lru(freezer):
+    calls = []
+
+    @request_cache(TTL, keyed=True, maxsize=2)
+    def make_request(host):
+        calls.append(host)
+        return host
+
+    make_request("a")
+    make_request("b")
+    make_request("a")  # "b" is now the least recently used
+    make_request("c")  # evicts "b"
+    make_request("a")
+    make_request("b")
+
+    assert calls == ["a", "b", "c", "b"]
+
+
+def test_request_cache__keyed_max_bytes(freezer):
+    calls = []
+
+    @request_cache(TTL, keyed=True, max_bytes=10, sizeof=len)
+    def make_request(payload):
+        calls.append(payload)
+        return payload
+
+    make_request("aaaa")
+    make_request("bbbb")
+    make_request("cccc")  # evicts "aaaa"
+    make_request("bbbb")
+    make_request("aaaa")
+
+    assert calls == ["aaaa", "bbbb", "cccc", "aaaa"]
+
+
+def test_request_cache__keyed_value_larger_than_max_bytes_not_cached(freezer):
+    calls = []
+
+    @request_cache(TTL, keyed=True, max_bytes=10, sizeof=len)
+    def make_request(payload):
+        calls.append(payload)
+        return payload
+
+    make_request("a")
+    make_request("x" * 11)
+    make_request("x" * 11)
+    make_request("a")
+
+    assert calls == ["a", "x" * 11, "x" * 11]
+
+
+def test_request_cache__keyed_clear_cache(freezer):
+    calls = []
+
+    @request_cache(TTL, keyed=True)
+    def make_request(host):
+        calls.append(host)
+        return host
+
+    make_request("a")
+    make_request("b")
+    make_request.clear_cache()
+    make_request("a")
+    make_request("b")
+
+    assert calls == ["a", "b", "a", "b"]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"maxsize": 2},
+        {"max_bytes": 100},
+        {"keyed": True, "sizeof": len},
+    ],
+)
+def test_request_cache__invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        request_cache(TTL, **kwargs)
+
+
+def test_request_cache__single_flight():
+    num_threads = 8
+    calls = []
+    release = Event()
+
+    @request_cache(TTL)
+    def make_request():
+        calls.append(1)
+        release.wait()
+        return len(calls)
+
+    results: list[int] = []
+    threads = [Thread(target=lambda: results.append(make_request())) for _ in range(num_threads)]
+    for t in threads:
+        t.start()
+
+    # Give the threads a chance to pile up behind the first call
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [1] * num_threads
+
+
+def test_request_cache__single_flight_propagates_exception():
+    release = Event()
+    calls = []
+
+    @request_cache(TTL)
+    def make_request():
+        calls.append(1)
+        release.wait()
+        raise ValueError()
+
+    errors: list[Exception] = []
+
+    def call():
+        try:
+            make_request()
+        except ValueError as err:
+            errors.append(err)
+
+    threads = [Thread(target=call) for _ in range(4)]
+    for t in threads:
+        t.start()
+
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 4
+
+    # Failures are not cached
+    release.set()
+    with pytest.raises(ValueError):
+        make_request()
+    assert len(calls) == 2
+
+
+def test_request_cache__hit_not_blocked_by_refresh():
+    release = Event()
+
+    @request_cache(TTL, keyed=True)
+    def make_request(host):
+        if host == "slow":
+            release.wait()
+        return host
+
+    make_request("fast")
+    slow_thread = Thread(target=make_request, args=("slow",))
+    slow_thread.start()
+
+    try:
+        hit_thread = Thread(target=make_request, args=("fast",))
+        hit_thread.start()
+        hit_thread.join(timeout=1)
+
+        assert not hit_thread.is_alive()
+    finally:
+        release.set()
+        slow_thread.join()
+
+
+def test_request_cache__clear_cache_during_refresh():
+    release = Event()
+    calls = []
+
+    @request_cache(TTL)
+    def make_request():
+        calls.append(1)
+        release.wait()
+        return len(calls)
+
+    t = Thread(target=make_request)
+    t.start()
+    time.sleep(0.05)
+    make_request.clear_cache()
+    release.set()
+    t.join()
+
+    # The value computed before the cache was cleared must not be cached
+    assert make_request() == 2
+
+
+def wait_for_value(fn: Callable, expected_value: Any, timeout: float = 1):
+    # Background refreshes run on another thread, so poll until the new value is cached
+    deadline = time.monotonic() + timeout
+    while fn() != expected_value:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_request_cache__stale_while_revalidate():
+    release = Event()
+    refreshed = Event()
+    calls: list[int] = []
+
+    @request_cache(0.01, stale_while_revalidate=TTL)
+    def make_request():
+        if calls:
+            release.wait()
+        calls.append(1)
+        if len(calls) == 2:
+            refreshed.set()
+        return len(calls)
+
+    assert make_request() == 1
+    time.sleep(0.02)
+
+    # The value has expired, but is still served while the refresh is blocked
+    assert make_request() == 1
+    assert make_request() == 1
+
+    release.set()
+    assert refreshed.wait(timeout=1)
+    assert len(calls) == 2
+    wait_for_value(make_request, 2)
+
+
+def test_request_cache__stale_while_revalidate_window_elapsed(freezer):
+    @request_cache(TTL, stale_while_revalidate=TTL)
+    def make_request():
+        return time.perf_counter_ns()
+
+    t1 = make_request()
+    freezer.tick(2 * TTL + 1)
+    t2 = make_request()
+
+    assert t1 != t2
+
+
+def test_request_cache__stale_while_revalidate_refresh_error_keeps_value():
+    refreshed = Event()
+    calls: list[int] = []
+
+    @request_cache(0.01, stale_while_revalidate=TTL)
+    def make_request():
+        calls.append(1)
+        if len(calls) > 1:
+            refreshed.set()
+            raise ValueError()
+        return len(calls)
+
+    assert make_request() == 1
+    time.sleep(0.02)
+
+    assert make_request() == 1
+    assert refreshed.wait(timeout=1)
+    assert make_request() == 1
+
+
+def test_request_cache__refresh_ahead(freezer):
+    refreshed = Event()
+    calls: list[int] = []
+
+    @request_cache(TTL, refresh_ahead=0.5)
+    def make_request():
+        calls.append(1)
+        if len(calls) > 1:
+            refreshed.set()
+        return len(calls)
+
+    assert make_request() == 1
+    freezer.tick(TTL / 2 - 1)
+    assert make_request() == 1
+    assert not refreshed.is_set()
+
+    freezer.tick(2)
+    # The value has not expired, so it is returned while being refreshed
+    assert make_request() == 1
+    assert refreshed.wait(timeout=1)
+    wait_for_value(make_request, 2)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"stale_while_revalidate": -1},
+        {"refresh_ahead": 0},
+        {"refresh_ahead": 1.5},
+    ],
+)
+def test_request_cache__invalid_refresh_arguments(kwargs):
+    with pytest.raises(ValueError):
+        request_cache(TTL, **kwargs)
+
+
+def test_request_cache__coroutine_function(freezer):
+    calls: list[int] = []
+
+    @request_cache(TTL)
+    async def make_request():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        r1 = await make_request()
+        r2 = await make_request()
+        freezer.tick(TTL + 1)
+        r3 = await make_request()
+
+        return r1, r2, r3
+
+    assert asyncio.run(run()) == (1, 1, 2)
+
+
+def test_request_cache__coroutine_function_shared_call():
+    calls: list[int] = []
+
+    @request_cache(TTL, keyed=True)
+    async def make_request(host):
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return host
+
+    async def run():
+        return await asyncio.gather(*(make_request(h) for h in ["a", "b", "a", "b", "a"]))
+
+    assert asyncio.run(run()) == ["a", "b", "a", "b", "a"]
+    assert len(calls) == 2
+
+
+def test_request_cache__coroutine_function_exception_not_cached():
+    calls: list[int] = []
+
+    @request_cache(TTL)
+    async def make_request():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise ValueError()
+
+    async def run():
+        results = await asyncio.gather(make_request(), make_request(), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+
+        with pytest.raises(ValueError):
+            await make_request()
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_request_cache__coroutine_function_cancel_caller():
+    calls: list[int] = []
+
+    @request_cache(TTL)
+    async def make_request():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def run():
+        cancelled = asyncio.create_task(make_request())
+        waiting = asyncio.create_task(make_request())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        # Cancelling one caller doesn't cancel the call that the other caller is waiting on
+        assert await waiting == 1
+        assert await make_request() == 1
+
+    asyncio.run(run())
+    assert len(calls) == 1
+
+
+def test_request_cache__coroutine_function_stale_while_revalidate():
+    calls: list[int] = []
+
+    @request_cache(0.01, stale_while_revalidate=TTL)
+    async def make_request():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        assert await make_request() == 1
+        await asyncio.sleep(0.02)
+
+        assert await make_request() == 1
+        await asyncio.sleep(0.01)
+        assert await make_request() == 2
+
+    asyncio.run(run())
+
+
+def test_request_cache__coroutine_function_clear_cache():
+    calls: list[int] = []
+
+    @request_cache(TTL)
+    async def make_request():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        assert await make_request() == 1
+        make_request.clear_cache()
+        assert await make_request() == 2
+
+    asyncio.run(run())
+
+
+def test_request_cache__cache_info(freezer):
+    @request_cache(TTL, keyed=True)
+    def make_request(host):
+        if host == "bad":
+            raise ValueError()
+        return host
+
+    make_request("a")
+    make_request("a")
+    make_request("b")
+    with pytest.raises(ValueError):
+        make_request("bad")
+    make_request.clear_cache()
+    make_request("a")
+
+    info = make_request.cache_info()
+    assert info.hits == 1
+    assert info.misses == 4
+    assert info.errors == 1
+    assert info.refreshes == 0
+    assert info.currsize == 1
+
+
+def test_request_cache__cache_info_call_time():
+    @request_cache(TTL)
+    def make_request():
+        time.sleep(0.01)
+
+    make_request()
+    make_request()
+
+    assert make_request.cache_info().call_time >= 0.01
+    assert make_request.cache_info().lock_wait_time >= 0
+
+
+def test_request_cache__cache_info_refreshes():
+    refreshed = Event()
+
+    @request_cache(0.01, stale_while_revalidate=TTL)
+    def make_request():
+        refreshed.set()
+
+    make_request()
+    refreshed.clear()
+    time.sleep(0.02)
+    make_request()
+
+    assert refreshed.wait(timeout=1)
+    assert make_request.cache_info().refreshes == 1
+    assert make_request.cache_info().hits == 1
+
+
+def test_request_cache__stats_hook(freezer):
+    published: list[RequestCacheInfo] = []
+
+    @request_cache(TTL, stats_hook=published.append)
+    def make_request():
+        return 1
+
+    make_request()
+    make_request()
+    make_request.clear_cache()
+    make_request()
+
+    # The hook is only called when the decorated function is called, not on cache hits
+    assert len(published) == 2
+    assert published[-1].misses == 2
+    assert published[-1].hits == 1
+
+
+def test_request_cache__stats_hook_error_is_not_raised():
+    def stats_hook(_):
+        raise Exception()
+
+    @request_cache(TTL, stats_hook=stats_hook)
+    def make_request():
+        return 1
+
+    assert make_request() == 1
+
+
+def test_request_cache__coroutine_function_cache_info():
+    @request_cache(TTL)
+    async def make_request():
+        return 1
+
+    async def run():
+        await make_request()
+        await make_request()
+
+    asyncio.run(run())
+
+    info = make_request.cache_info()
+    assert info.hits == 1
+    assert info.misses == 1
+    assert info.lock_wait_time == 0
+
+
+def make_persisted_request_fn(
+    persist_dir: Path, calls: list, persist_name: str = "make_request", **kwargs
+) -> Any:
+    # Saving the caches, as happens when the program exits, and then defining a function with the
+    # same persist_name simulates restarting the program
+    _persist_request_caches()
+
+    @request_cache(TTL, persist_dir=persist_dir, persist_name=persist_name, **kwargs)
+    def make_request(*args, **kwargs):
+        calls.append((args, kwargs))
+        return len(calls)
+
+    return make_request
+
+
+def test_request_cache__persist_dir(tmp_path):
+    calls: list = []
+    persist_dir = tmp_path / "cache"
+
+    assert make_persisted_request_fn(persist_dir, calls)() == 1
+    assert make_persisted_request_fn(persist_dir, calls)() == 1
+
+    assert len(calls) == 1
+    assert persist_dir.is_dir()
+
+
+def test_request_cache__persist_dir_expired(tmp_path, freezer):
+    calls: list = []
+
+    make_persisted_request_fn(tmp_path, calls)()
+    freezer.tick(TTL + 1)
+
+    assert make_persisted_request_fn(tmp_path, calls)() == 2
+
+
+def test_request_cache__persist_dir_keeps_ttl(tmp_path, freezer):
+    calls: list = []
+
+    make_persisted_request_fn(tmp_path, calls)()
+    freezer.tick(TTL - 1)
+    make_request = make_persisted_request_fn(tmp_path, calls)
+    assert make_request() == 1
+
+    freezer.tick(2)
+    assert make_request() == 2
+
+
+def test_request_cache__persist_dir_keyed(tmp_path):
+    calls: list = []
+
+    make_request = make_persisted_request_fn(tmp_path, calls, keyed=True)
+    make_request("a", port=1)
+    make_request("b")
+
+    make_request = make_persisted_request_fn(tmp_path, calls, keyed=True)
+    assert make_request("a", port=1) == 1
+    assert make_request("b") == 2
+    assert make_request("a", port=2) == 3
+
+
+@pytest.mark.skipif(
+    get_os() == OperatingSystem.WINDOWS, reason="Tests Posix (not Windows) permissions."
+)
+def test_request_cache__persist_dir_permissions(tmp_path):
+    persist_dir = tmp_path / "cache"
+
+    make_persisted_request_fn(persist_dir, [])()
+    _persist_request_caches()
+
+    assert_linux_permissions(persist_dir)
+    for f in persist_dir.iterdir():
+        assert stat.S_IMODE(f.stat().st_mode) == stat.S_IRUSR | stat.S_IWUSR
+
+
+def test_request_cache__persist_dir_saves_in_background(tmp_path, monkeypatch):
+    writing_threads = []
+
+    def write_file_atomically(path: Path, contents: bytes):
+        if path.parent == tmp_path:
+            writing_threads.append(current_thread())
+        path.write_bytes(contents)
+
+    monkeypatch.setattr("monkeytoolbox.decorators.write_file_atomically", write_file_atomically)
+    monkeypatch.setattr("monkeytoolbox.decorators._PERSIST_INTERVAL", 0.01)
+
+    make_request = make_persisted_request_fn(tmp_path, [])
+    make_request()
+    deadline = time.monotonic() + 5
+    while not list(tmp_path.iterdir()):
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+    assert current_thread() not in writing_threads
+
+
+def test_request_cache__persist_dir_not_created(tmp_path):
+    calls: list = []
+    persist_dir = tmp_path / "file"
+    persist_dir.write_bytes(b"")
+
+    make_request = make_persisted_request_fn(persist_dir, calls)
+
+    assert make_request() == 1
+    assert make_request() == 1
+
+
+def test_request_cache__persist_dir_separate_names(tmp_path):
+    calls: list = []
+
+    make_persisted_request_fn(tmp_path, calls, persist_name="a")()
+
+    assert make_persisted_request_fn(tmp_path, calls, persist_name="b")() == 2
+    assert make_persisted_request_fn(tmp_path, calls, persist_name="a")() == 1
+
+
+def test_request_cache__persist_dir_requires_name_for_local_function(tmp_path):
+    with pytest.raises(ValueError):
+
+        @request_cache(TTL, persist_dir=tmp_path)
+        def make_request():
+            pass
+
+
+def test_request_cache__persist_name_without_persist_dir():
+    with pytest.raises(ValueError):
+        request_cache(TTL, persist_name="make_request")
+
+
+@pytest.mark.skipif(
+    get_os() == OperatingSystem.WINDOWS, reason="Tests Posix (not Windows) permissions."
+)
+def test_request_cache__persist_dir_insecure_file(tmp_path):
+    calls: list = []
+
+    make_persisted_request_fn(tmp_path, calls)()
+    _persist_request_caches()
+    for f in tmp_path.iterdir():
+        f.chmod(0o644)
+
+    assert make_persisted_request_fn(tmp_path, calls)() == 2
+
+
+def test_request_cache__persist_dir_clear_cache(tmp_path):
+    calls: list = []
+
+    make_persisted_request_fn(tmp_path, calls)()
+    make_persisted_request_fn(tmp_path, calls).clear_cache()
+
+    assert make_persisted_request_fn(tmp_path, calls)() == 2
+
+
+def test_request_cache__persist_dir_unpicklable_value(tmp_path):
+    @request_cache(TTL, persist_dir=tmp_path, persist_name="make_request")
+    def make_request():
+        return lambda: None
+
+    assert callable(make_request())
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_request_cache__persist_dir_corrupt_file(tmp_path):
+    calls: list = []
+
+    make_persisted_request_fn(tmp_path, calls)()
+    _persist_request_caches()
+    for f in tmp_path.iterdir():
+        f.write_bytes(b"garbage")
+
+    assert make_persisted_request_fn(tmp_path, calls)() == 2
+
+
+def test_request_cache__persist_dir_coroutine_function(tmp_path):
+    calls: list[int] = []
+
+    def make_request_fn():
+        _persist_request_caches()
+
+        @request_cache(TTL, persist_dir=tmp_path, persist_name="make_request")
+        async def make_request():
+            calls.append(1)
+            return len(calls)
+
+        return make_request
+
+    async def run():
+        return await make_request_fn()()
+
+    assert asyncio.run(run()) == 1
+    assert asyncio.run(run()) == 1
@@ -1,21 +1,48 @@
+import gc
+import hashlib
 import os
+import socket
 import stat
-from io import SEEK_SET, BytesIO
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import SEEK_END, SEEK_SET, BufferedReader, BytesIO
+from pathlib import Path
+from typing import BinaryIO
+from collections.abc import Iterable
+from unittest.mock import MagicMock
 
 import pytest
 from monkeytypes import OperatingSystem
 
 from monkeytoolbox import (
+    BatchedAppender,
+    FileHashCache,
+    FileTooLargeError,
     InvalidPath,
+    PeriodicScheduler,
+    SymlinkPolicy,
+    append_binary_io,
     append_bytes,
+    copy_binary_io,
+    copy_binary_io_with_hashes,
     create_secure_directory,
     expand_path,
     get_all_regular_files_in_directory,
+    get_binary_io_hashes,
     get_binary_io_sha256_hash,
+    get_file_sha256_hashes,
     get_os,
+    iter_text_file_chunks,
+    iter_text_file_lines,
     make_fileobj_copy,
+    make_spooled_fileobj_copy,
+    memory_map_file,
     open_new_securely_permissioned_file,
+    walk_regular_files,
 )
+from monkeytoolbox.file_utils import _MAX_IOVECS, MAX_BLOCK_SIZE
 from monkeytoolbox.secure_directory import FailedDirectoryCreationError
 from tests.utils import (
     add_files_to_dir,
@@ -153,6 +180,69 @@ def test_open_new_securely_permissioned_file__perm_windows(test_path):
     assert_windows_permissions(test_path)
 
 
+TEXT = "First line\r\nSecond line: \u20ac\u20ac\u20ac\n\nLast line"
+
+
+@pytest.fixture
+def text_file(tmp_path) -> Path:
+    file_path = tmp_path / "text_file"
+    file_path.write_bytes(TEXT.encode("utf-8"))
+
+    return file_path
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, MAX_BLOCK_SIZE])
+def test_iter_text_file_chunks(text_file, chunk_size):
+    chunks = list(iter_text_file_chunks(text_file, chunk_size, encoding="utf-8"))
+
+    assert "".join(chunks) == TEXT.replace("\r\n", "\n")
+    assert all(chunks)
+
+
+def test_iter_text_file_chunks__max_bytes(text_file):
+    chunks = iter_text_file_chunks(text_file, 5, encoding="utf-8", max_bytes=12)
+
+    assert next(chunks) == "First"
+    assert next(chunks) == " line"
+    with pytest.raises(FileTooLargeError):
+        next(chunks)
+
+
+def test_iter_text_file_lines(text_file):
+    lines = list(iter_text_file_lines(text_file, encoding="utf-8"))
+
+    assert lines == ["First line\n", "Second line: \u20ac\u20ac\u20ac\n", "\n", "Last line"]
+
+
+def test_iter_text_file_lines__matches_file_iteration(tmp_path):
+    file_path = tmp_path / "text_file"
+    file_path.write_text("a" * (MAX_BLOCK_SIZE * 2) + "\nb\n\n" + "c" * MAX_BLOCK_SIZE + "\n")
+
+    with open(file_path, "rt") as f:
+        assert list(iter_text_file_lines(file_path)) == list(f)
+
+
+def test_iter_text_file_lines__max_bytes(text_file):
+    with pytest.raises(FileTooLargeError):
+        list(iter_text_file_lines(text_file, encoding="utf-8", max_bytes=10))
+
+
+def test_memory_map_file(text_file):
+    with memory_map_file(text_file) as contents:
+        assert contents.readonly
+        assert contents == TEXT.encode("utf-8")
+        with contents[6:10] as word:
+            assert word == b"line"
+
+
+def test_memory_map_file__empty(tmp_path):
+    file_path = tmp_path / "empty_file"
+    file_path.touch()
+
+    with memory_map_file(file_path) as contents:
+        assert len(contents) == 0
+
+
 def test_make_fileobj_copy():
     TEST_STR = b"Hello World"
     with BytesIO(TEST_STR) as src:
@@ -176,6 +266,72 @@ def test_make_fileobj_copy_seek_src_to_0():
         assert dst.read() == TEST_STR
 
 
+def test_make_fileobj_copy__bytes_io_copy_on_write():
+    with BytesIO(b"Hello World") as src:
+        dst = make_fileobj_copy(src)
+        src.write(b"J")
+        dst.seek(6)
+        dst.write(b"Earth")
+
+        src.seek(0)
+        dst.seek(0)
+
+        assert src.read() == b"Jello World"
+        assert dst.read() == b"Hello Earth"
+
+
+@pytest.fixture
+def large_file(tmp_path) -> Path:
+    file_path = tmp_path / "large_file"
+    file_path.write_bytes(os.urandom(3 * 1024) * 100)
+
+    return file_path
+
+
+@pytest.mark.parametrize("max_memory_size", [10, 1024 * 1024])
+def test_make_spooled_fileobj_copy__file(large_file, max_memory_size):
+    with open(large_file, "rb") as src:
+        src.seek(100)
+        with make_spooled_fileobj_copy(src, max_memory_size=max_memory_size) as dst:
+            assert src.read() == large_file.read_bytes()
+            assert dst.read() == large_file.read_bytes()
+
+
+def test_make_spooled_fileobj_copy__file_spills_to_disk(large_file):
+    with open(large_file, "rb") as src:
+        with make_spooled_fileobj_copy(src, max_memory_size=1024) as dst:
+            assert dst.fileno() != src.fileno()
+            assert os.fstat(dst.fileno()).st_size == large_file.stat().st_size
+
+
+def test_make_spooled_fileobj_copy__copy_file_range_unsupported(monkeypatch, large_file):
+    def copy_file_range(*_):
+        raise OSError("Not supported")
+
+    monkeypatch.setattr(os, "copy_file_range", copy_file_range, raising=False)
+
+    with open(large_file, "rb") as src:
+        with make_spooled_fileobj_copy(src, max_memory_size=1024) as dst:
+            assert dst.read() == large_file.read_bytes()
+
+
+def test_make_spooled_fileobj_copy__stream():
+    contents = os.urandom(3 * 1024)
+
+    with BufferedReader(BytesIO(contents)) as src:  # type: ignore [arg-type]
+        with make_spooled_fileobj_copy(src, max_memory_size=1024) as dst:
+            assert dst.read() == contents
+
+
+def test_make_spooled_fileobj_copy__bytes_io():
+    with BytesIO(b"Hello World") as src:
+        src.seek(5)
+        dst = make_spooled_fileobj_copy(src)
+
+        assert src.read() == b"Hello World"
+        assert dst.read() == b"Hello World"
+
+
 def test_append_bytes__pos_0():
     bytes_io = BytesIO(b"1234 5678")
 
@@ -195,6 +351,227 @@ def test_append_bytes__pos_5():
     assert bytes_io.read() == b"1234 5678abcd"
 
 
+@pytest.fixture(params=["file", "bytes_io"])
+def appended_file(request, tmp_path):
+    if request.param == "bytes_io":
+        yield BytesIO(b"1234 5678")
+        return
+
+    file_path = tmp_path / "appended_file"
+    file_path.write_bytes(b"1234 5678")
+    with open(file_path, "r+b") as f:
+        yield f
+
+
+def read_all(file: BinaryIO) -> bytes:
+    file.seek(0)
+    return file.read()
+
+
+def test_batched_appender(appended_file):
+    appended_file.seek(5)
+
+    with BatchedAppender(appended_file) as appender:
+        appender.append(b"ab")
+        appender.append(b"cd")
+
+        assert read_all(appended_file) == b"1234 5678"
+        appended_file.seek(5)
+
+    assert appended_file.read() == b"5678abcd"
+
+
+def test_batched_appender__max_buffer_size(appended_file):
+    appender = BatchedAppender(appended_file, max_buffer_size=4)
+
+    appender.append(b"abc")
+    assert read_all(appended_file) == b"1234 5678"
+
+    appender.append(b"d")
+    assert read_all(appended_file) == b"1234 5678abcd"
+
+
+def test_batched_appender__flush(appended_file):
+    appender = BatchedAppender(appended_file)
+
+    appender.append(b"ab")
+    appender.flush()
+
+    assert read_all(appended_file) == b"1234 5678ab"
+
+
+def test_batched_appender__max_delay(appended_file):
+    scheduler = PeriodicScheduler(name="TestScheduler")
+    appender = BatchedAppender(appended_file, max_delay=0.01, scheduler=scheduler)
+
+    def contents() -> bytes:
+        # Reading through the file object would move its position while the appender flushes
+        if isinstance(appended_file, BytesIO):
+            return appended_file.getvalue()
+        return Path(appended_file.name).read_bytes()
+
+    try:
+        with appender:
+            appender.append(b"ab")
+
+            deadline = time.monotonic() + 5
+            while contents() != b"1234 5678ab":
+                assert time.monotonic() < deadline
+                time.sleep(0.001)
+    finally:
+        scheduler.shutdown()
+
+
+def test_batched_appender__many_chunks(appended_file):
+    chunks = [str(i).encode() for i in range(_MAX_IOVECS * 2 + 1)]
+
+    with BatchedAppender(appended_file) as appender:
+        for chunk in chunks:
+            appender.append(chunk)
+
+    assert read_all(appended_file) == b"1234 5678" + b"".join(chunks)
+
+
+def test_batched_appender__partial_writes(monkeypatch, tmp_path):
+    pwritev = os.pwritev
+    monkeypatch.setattr(
+        os, "pwritev", lambda fd, buffers, offset: pwritev(fd, [b"".join(buffers)[:3]], offset)
+    )
+    file_path = tmp_path / "appended_file"
+    file_path.write_bytes(b"")
+
+    with open(file_path, "r+b") as f, BatchedAppender(f) as appender:
+        appender.append(b"")
+        appender.append(b"abcd")
+        appender.append(b"efghijk")
+
+    assert file_path.read_bytes() == b"abcdefghijk"
+
+
+def test_batched_appender__nothing_written(monkeypatch, tmp_path):
+    monkeypatch.setattr(os, "pwritev", lambda fd, buffers, offset: 0)
+    file_path = tmp_path / "appended_file"
+    file_path.write_bytes(b"")
+
+    with open(file_path, "r+b") as f:
+        appender = BatchedAppender(f)
+        appender.append(b"abcd")
+
+        with pytest.raises(OSError):
+            appender.flush()
+
+
+def test_batched_appender__garbage_collected(appended_file):
+    scheduler = PeriodicScheduler(name="TestScheduler")
+    appender = BatchedAppender(appended_file, max_delay=10, scheduler=scheduler)
+    appender.append(b"ab")
+    appender_ref = weakref.ref(appender)
+    flush_task = appender._flush_task
+
+    try:
+        del appender
+        gc.collect()
+
+        assert appender_ref() is None
+        assert flush_task is not None and flush_task.cancelled
+        assert read_all(appended_file) == b"1234 5678ab"
+    finally:
+        scheduler.shutdown()
+
+
+def test_batched_appender__closed(appended_file):
+    appender = BatchedAppender(appended_file)
+    appender.close()
+
+    with pytest.raises(ValueError):
+        appender.append(b"ab")
+
+
+def test_copy_binary_io__file(large_file, tmp_path):
+    contents = large_file.read_bytes()
+    dst_path = tmp_path / "copy"
+
+    with open(large_file, "rb") as src, open(dst_path, "wb") as dst:
+        src.read(10)
+        dst.write(b"Buffered")
+
+        assert copy_binary_io(src, dst) == len(contents) - 10
+        assert src.read() == b""
+        dst.write(b"End")
+
+    assert dst_path.read_bytes() == b"Buffered" + contents[10:] + b"End"
+
+
+def test_copy_binary_io__kernel_copy_unsupported(monkeypatch, large_file, tmp_path):
+    def fail(*_):
+        raise OSError("Not supported")
+
+    monkeypatch.setattr(os, "copy_file_range", fail, raising=False)
+    monkeypatch.setattr(os, "sendfile", fail, raising=False)
+    dst_path = tmp_path / "copy"
+
+    with open(large_file, "rb") as src, open(dst_path, "wb") as dst:
+        copy_binary_io(src, dst)
+
+    assert dst_path.read_bytes() == large_file.read_bytes()
+
+
+def test_copy_binary_io__append_mode(large_file, tmp_path):
+    dst_path = tmp_path / "copy"
+    dst_path.write_bytes(b"Start")
+
+    with open(large_file, "rb") as src, open(dst_path, "ab") as dst:
+        copy_binary_io(src, dst)
+
+    assert dst_path.read_bytes() == b"Start" + large_file.read_bytes()
+
+
+def test_copy_binary_io__bytes_io_to_file(tmp_path):
+    dst_path = tmp_path / "copy"
+
+    with open(dst_path, "wb") as dst:
+        assert copy_binary_io(BytesIO(b"Hello World"), dst) == 11
+
+    assert dst_path.read_bytes() == b"Hello World"
+
+
+def test_copy_binary_io__socket(large_file):
+    contents = large_file.read_bytes()
+    sender, receiver = socket.socketpair()
+
+    with sender, receiver, open(large_file, "rb") as src:
+        receiver_thread = ThreadPoolExecutor(1).submit(receive_all, receiver)
+        copy_binary_io(src, sender)
+        sender.shutdown(socket.SHUT_WR)
+
+        assert receiver_thread.result() == contents
+
+
+def receive_all(receiver: socket.socket) -> bytes:
+    received = BytesIO()
+    while data := receiver.recv(MAX_BLOCK_SIZE):
+        received.write(data)
+
+    return received.getvalue()
+
+
+@pytest.mark.parametrize("src_type", ["bytes_io", "file"])
+def test_append_binary_io(src_type, large_file, tmp_path):
+    contents = large_file.read_bytes()
+    file_path = tmp_path / "file"
+    file_path.write_bytes(b"1234 5678")
+
+    with open(file_path, "r+b") as file, open(large_file, "rb") as src_file:
+        src = BytesIO(contents) if src_type == "bytes_io" else src_file
+        file.seek(5)
+
+        append_binary_io(file, src)
+
+        assert file.read() == b"5678" + contents
+
+    assert file_path.read_bytes() == b"1234 5678" + contents
+
+
 def test_expand_user(patched_home_env):
     input_path = os.path.join("~", "test")
     expected_path = patched_home_env / "test"
@@ -219,6 +596,131 @@ def test_get_binary_sha256_hash():
     assert get_binary_io_sha256_hash(BytesIO(b"Hello World")) == expected_hash
 
 
+HASHED_BYTES = os.urandom(100000)
+
+
+class NonReadintoIO:
+    """A file-like object that only supports `read()`"""
+
+    def __init__(self, data: bytes):
+        self._bytes_io = BytesIO(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._bytes_io.read(size)
+
+
+@pytest.fixture(params=["bytes_io", "file", "read_only"])
+def hashed_binary(request, tmp_path):
+    if request.param == "bytes_io":
+        yield BytesIO(HASHED_BYTES)
+    elif request.param == "file":
+        file_path = tmp_path / "hashed_file"
+        file_path.write_bytes(HASHED_BYTES)
+        with open(file_path, "rb") as f:
+            yield f
+    else:
+        yield NonReadintoIO(HASHED_BYTES)
+
+
+@pytest.mark.parametrize("block_size", [1000, 4096, MAX_BLOCK_SIZE, 1000000])
+def test_get_binary_io_sha256_hash__block_size(hashed_binary, block_size):
+    expected_hash = hashlib.sha256(HASHED_BYTES).hexdigest()
+
+    assert get_binary_io_sha256_hash(hashed_binary, block_size=block_size) == expected_hash
+    assert hashed_binary.read(1) == b""
+
+
+def test_get_binary_io_sha256_hash__from_current_position(hashed_binary):
+    expected_hash = hashlib.sha256(HASHED_BYTES[1000:]).hexdigest()
+    hashed_binary.read(1000)
+
+    assert get_binary_io_sha256_hash(hashed_binary) == expected_hash
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+@pytest.mark.parametrize("block_size", [1000, MAX_BLOCK_SIZE])
+def test_get_binary_io_hashes(hashed_binary, block_size, parallel):
+    algorithms = ["sha256", "sha1", "md5", "blake2b"]
+    expected_hashes = {a: hashlib.new(a, HASHED_BYTES[10:]).hexdigest() for a in algorithms}
+    hashed_binary.read(10)
+
+    hashes = get_binary_io_hashes(
+        hashed_binary, algorithms, block_size=block_size, parallel=parallel
+    )
+
+    assert hashes == expected_hashes
+    assert hashed_binary.read(1) == b""
+
+
+def test_get_binary_io_hashes__parallel_read_error():
+    binary = MagicMock()
+    binary.read.side_effect = [b"a" * 1000] * 20 + [OSError("read failed")]
+
+    with pytest.raises(OSError):
+        get_binary_io_hashes(binary, ["sha256", "md5"], block_size=1000, parallel=True)
+
+
+def test_get_binary_io_hashes__no_algorithms():
+    assert get_binary_io_hashes(BytesIO(b"Hello World"), []) == {}
+
+
+@pytest.mark.parametrize("algorithm", ["shake_128", "not_an_algorithm"])
+def test_get_binary_io_hashes__unsupported_algorithm(algorithm):
+    with pytest.raises(ValueError):
+        get_binary_io_hashes(BytesIO(b"Hello World"), ["sha256", algorithm])
+
+
+def test_copy_binary_io_with_hashes(hashed_binary, tmp_path):
+    algorithms = ["sha256", "md5"]
+    expected_hashes = {a: hashlib.new(a, HASHED_BYTES[10:]).hexdigest() for a in algorithms}
+    hashed_binary.read(10)
+
+    with open(tmp_path / "copy", "wb") as dst:
+        hashes, returned_dst = copy_binary_io_with_hashes(hashed_binary, dst, algorithms)
+
+    assert hashes == expected_hashes
+    assert returned_dst is dst
+    assert (tmp_path / "copy").read_bytes() == HASHED_BYTES[10:]
+
+
+def test_copy_binary_io_with_hashes__bytes_io():
+    dst = BytesIO(b"Hello ")
+    dst.seek(0, SEEK_END)
+
+    hashes, _ = copy_binary_io_with_hashes(BytesIO(b"World"), dst, block_size=2)
+
+    assert hashes == {"sha256": hashlib.sha256(b"World").hexdigest()}
+    assert dst.getvalue() == b"Hello World"
+
+
+def test_copy_binary_io_with_hashes__socket():
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        hashes, _ = copy_binary_io_with_hashes(BytesIO(b"Hello World"), sender)
+        sender.shutdown(socket.SHUT_WR)
+
+        assert receiver.recv(1024) == b"Hello World"
+        assert hashes == {"sha256": hashlib.sha256(b"Hello World").hexdigest()}
+
+
+def test_copy_binary_io_with_hashes__unsupported_algorithm():
+    dst = BytesIO()
+
+    with pytest.raises(ValueError):
+        copy_binary_io_with_hashes(BytesIO(b"Hello World"), dst, ["shake_128"])
+
+    assert dst.getvalue() == b""
+
+
+def test_get_binary_io_sha256_hash__bytes_io_remains_writable():
+    bytes_io = BytesIO(b"Hello")
+
+    get_binary_io_sha256_hash(bytes_io)
+    bytes_io.write(b" World")
+
+    assert bytes_io.getvalue() == b"Hello World"
+
+
 SUBDIRS = ["subdir1", "subdir2"]
 FILES = ["file.jpg.zip", "file.xyz", "1.tar", "2.tgz", "2.png", "2.mpg"]
 
@@ -245,3 +747,231 @@ def test_get_all_regular_files_in_directory__subdir_has_files(tmp_path, monkeypa
 
     expected_return_value = sorted(files)
     assert sorted(get_all_regular_files_in_directory(tmp_path)) == expected_return_value
+
+
+@pytest.fixture
+def files_to_hash(tmp_path) -> dict[Path, bytes]:
+    files = {tmp_path / f"file{i}": os.urandom(i * 1000) for i in range(10)}
+    for file_path, contents in files.items():
+        file_path.write_bytes(contents)
+
+    return files
+
+
+def test_get_file_sha256_hashes(files_to_hash):
+    expected_hashes = {p: hashlib.sha256(c).hexdigest() for p, c in files_to_hash.items()}
+
+    assert get_file_sha256_hashes(files_to_hash, max_workers=4) == expected_hashes
+
+
+def test_get_file_sha256_hashes__unhashable_files(tmp_path, files_to_hash):
+    expected_hashes = {p: hashlib.sha256(c).hexdigest() for p, c in files_to_hash.items()}
+    missing_file = tmp_path / "missing"
+    directory = tmp_path / "directory"
+    directory.mkdir()
+
+    hashes = get_file_sha256_hashes([*files_to_hash, missing_file, directory])
+
+    assert hashes == expected_hashes
+
+
+def test_get_file_sha256_hashes__cache_hit(files_to_hash, monkeypatch):
+    cache = FileHashCache()
+    expected_hashes = get_file_sha256_hashes(files_to_hash, cache=cache)
+    monkeypatch.setattr(
+        "monkeytoolbox.file_utils.open", MagicMock(side_effect=AssertionError), raising=False
+    )
+
+    assert len(cache) == len(files_to_hash)
+    assert get_file_sha256_hashes(files_to_hash, cache=cache) == expected_hashes
+
+
+def test_get_file_sha256_hashes__file_modified(files_to_hash):
+    cache = FileHashCache()
+    file_path = next(iter(files_to_hash))
+    get_file_sha256_hashes([file_path], cache=cache)
+
+    file_path.write_bytes(b"modified")
+
+    assert get_file_sha256_hashes([file_path], cache=cache) == {
+        file_path: hashlib.sha256(b"modified").hexdigest()
+    }
+
+
+def test_file_hash_cache__persisted(tmp_path, files_to_hash):
+    cache_file = tmp_path / "cache.json"
+    cache = FileHashCache(cache_file)
+    expected_hashes = get_file_sha256_hashes(files_to_hash, cache=cache)
+    cache.save()
+
+    loaded_cache = FileHashCache(cache_file)
+
+    assert len(loaded_cache) == len(files_to_hash)
+    for file_path, file_hash in expected_hashes.items():
+        assert loaded_cache.get(os.stat(file_path)) == file_hash
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        "{not json",
+        '{"version": 1}',
+        "[1, 2]",
+        '{"version": 1, "hashes": [[1, 2, 3]]}',
+        '{"version": 1, "hashes": 5}',
+    ],
+)
+def test_file_hash_cache__corrupt_cache_file(tmp_path, contents):
+    cache_file = tmp_path / "cache.json"
+    cache_file.write_text(contents)
+
+    assert len(FileHashCache(cache_file)) == 0
+
+
+def test_file_hash_cache__prune(files_to_hash):
+    cache = FileHashCache()
+    get_file_sha256_hashes(files_to_hash, cache=cache)
+    cache.prune()
+    modified_file, deleted_file, *unchanged_files = files_to_hash
+    modified_file.write_bytes(b"modified")
+    deleted_file.unlink()
+
+    expected_hashes = get_file_sha256_hashes([modified_file, *unchanged_files], cache=cache)
+    cache.prune()
+
+    assert len(cache) == len(files_to_hash) - 1
+    assert get_file_sha256_hashes([modified_file, *unchanged_files], cache=cache) == (
+        expected_hashes
+    )
+
+
+def test_file_hash_cache__prune_unused(files_to_hash):
+    cache = FileHashCache()
+    get_file_sha256_hashes(files_to_hash, cache=cache)
+    cache.prune()
+
+    cache.prune()
+
+    assert len(cache) == 0
+
+
+def test_file_hash_cache__save_without_cache_file():
+    with pytest.raises(ValueError):
+        FileHashCache().save()
+
+
+@pytest.fixture
+def directory_tree(tmp_path) -> Path:
+    # tmp_path
+    # ├── a.txt
+    # ├── b.log
+    # └── sub1
+    #     ├── c.txt
+    #     └── sub2
+    #         └── d.bin
+    (tmp_path / "sub1" / "sub2").mkdir(parents=True)
+    for file_path in ["a.txt", "b.log", "sub1/c.txt", "sub1/sub2/d.bin"]:
+        (tmp_path / file_path).write_bytes(b"")
+
+    return tmp_path
+
+
+def relative_paths(paths: Iterable[Path], root: Path) -> set[str]:
+    return {path.relative_to(root).as_posix() for path in paths}
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+@pytest.mark.parametrize(
+    "kwargs, expected_files",
+    [
+        ({}, {"a.txt", "b.log", "sub1/c.txt", "sub1/sub2/d.bin"}),
+        ({"max_depth": 0}, {"a.txt", "b.log"}),
+        ({"max_depth": 1}, {"a.txt", "b.log", "sub1/c.txt"}),
+        ({"patterns": ["*.txt"]}, {"a.txt", "sub1/c.txt"}),
+        ({"patterns": ["a*", "d*"]}, {"a.txt", "sub1/sub2/d.bin"}),
+        ({"extensions": [".log", ".bin"]}, {"b.log", "sub1/sub2/d.bin"}),
+        ({"patterns": ["*.txt"], "max_depth": 0}, {"a.txt"}),
+    ],
+)
+def test_walk_regular_files(directory_tree, kwargs, expected_files, max_workers):
+    file_paths = walk_regular_files(directory_tree, max_workers=max_workers, **kwargs)
+
+    assert relative_paths(file_paths, directory_tree) == expected_files
+
+
+def test_walk_regular_files__missing_directory(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        walk_regular_files(tmp_path / "missing")
+
+
+def test_walk_regular_files__yields_files_as_they_are_listed(tmp_path, monkeypatch):
+    for i in range(100):
+        (tmp_path / f"file{i}").write_bytes(b"")
+    listed_entries = []
+    scandir = os.scandir
+
+    def record_entries(entries):
+        for entry in entries:
+            listed_entries.append(entry)
+            yield entry
+
+    @contextmanager
+    def recording_scandir(path):
+        with scandir(path) as entries:
+            yield record_entries(entries)
+
+    file_paths = walk_regular_files(tmp_path)
+    monkeypatch.setattr("monkeytoolbox.file_utils.os.scandir", recording_scandir)
+    next(file_paths)
+
+    assert len(listed_entries) == 1
+
+
+@pytest.fixture
+def directory_tree_with_symlinks(directory_tree) -> Path:
+    (directory_tree / "link_to_a.txt").symlink_to(directory_tree / "a.txt")
+    (directory_tree / "link_to_sub2").symlink_to(directory_tree / "sub1" / "sub2")
+    # A loop, which must not be followed forever
+    (directory_tree / "sub1" / "sub2" / "link_to_root").symlink_to(directory_tree)
+
+    return directory_tree
+
+
+@pytest.mark.skipif(is_windows_os(), reason="Creating symlinks requires privileges on Windows.")
+@pytest.mark.parametrize("max_workers", [1, 4])
+@pytest.mark.parametrize(
+    "symlink_policy, expected_files",
+    [
+        (SymlinkPolicy.SKIP, {"a.txt", "b.log", "sub1/c.txt", "sub1/sub2/d.bin"}),
+        (
+            SymlinkPolicy.FILES,
+            {"a.txt", "b.log", "sub1/c.txt", "sub1/sub2/d.bin", "link_to_a.txt"},
+        ),
+    ],
+)
+def test_walk_regular_files__symlinks(
+    directory_tree_with_symlinks, symlink_policy, expected_files, max_workers
+):
+    file_paths = walk_regular_files(
+        directory_tree_with_symlinks, symlink_policy=symlink_policy, max_workers=max_workers
+    )
+
+    assert relative_paths(file_paths, directory_tree_with_symlinks) == expected_files
+
+
+@pytest.mark.skipif(is_windows_os(), reason="Creating symlinks requires privileges on Windows.")
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_walk_regular_files__follow_symlinks(directory_tree_with_symlinks, max_workers):
+    file_paths = walk_regular_files(
+        directory_tree_with_symlinks, symlink_policy=SymlinkPolicy.FOLLOW, max_workers=max_workers
+    )
+    files = relative_paths(file_paths, directory_tree_with_symlinks)
+
+    # sub1/sub2 and link_to_sub2 are the same directory, so it's only walked once
+    assert files - {"sub1/sub2/d.bin", "link_to_sub2/d.bin"} == {
+        "a.txt",
+        "b.log",
+        "sub1/c.txt",
+        "link_to_a.txt",
+    }
+    assert len(files & {"sub1/sub2/d.bin", "link_to_sub2/d.bin"}) == 1
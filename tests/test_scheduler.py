@@ -0,0 +1,492 @@
+import asyncio
+import os
+import threading
+import time
+from threading import Event
+from collections.abc import Iterator
+
+import pytest
+
+from monkeytoolbox import (
+    AsyncPeriodicCaller,
+    Backoff,
+    OverrunPolicy,
+    PeriodicCaller,
+    PeriodicScheduler,
+    Schedule,
+)
+
+PERIOD = 0.02
+
+
+@pytest.fixture
+def scheduler() -> Iterator[PeriodicScheduler]:
+    scheduler = PeriodicScheduler(max_workers=2, name="TestScheduler")
+    yield scheduler
+    scheduler.shutdown()
+
+
+def wait_for_calls(calls: list, num_calls: int, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while len(calls) < num_calls:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_schedule__calls_callback_periodically(scheduler):
+    calls: list[float] = []
+
+    task = scheduler.schedule(lambda: calls.append(time.monotonic()), Schedule(PERIOD))
+    wait_for_calls(calls, 3)
+    task.cancel()
+
+    assert calls[2] - calls[0] >= 2 * PERIOD
+
+
+def test_schedule__shares_threads(scheduler):
+    num_tasks = 50
+    calls: list[list[int]] = [[] for _ in range(num_tasks)]
+    thread_count_before = threading.active_count()
+
+    tasks = [
+        scheduler.schedule(lambda i=i: calls[i].append(1), Schedule(PERIOD))
+        for i in range(num_tasks)
+    ]
+    for task_calls in calls:
+        wait_for_calls(task_calls, 2)
+
+    # One dispatcher thread and at most 2 worker threads
+    assert threading.active_count() - thread_count_before <= 3
+
+    for task in tasks:
+        task.cancel()
+
+
+def test_schedule__inline(scheduler):
+    thread_names: list[str] = []
+
+    task = scheduler.schedule(
+        lambda: thread_names.append(threading.current_thread().name),
+        Schedule(PERIOD),
+        inline=True,
+    )
+    wait_for_calls(thread_names, 2)
+    task.cancel()
+
+    assert set(thread_names) == {"TestScheduler-dispatcher"}
+
+
+def test_schedule__slow_callback_does_not_delay_others(scheduler):
+    release = Event()
+    calls: list[int] = []
+
+    slow_task = scheduler.schedule(lambda: release.wait(5), Schedule(PERIOD))
+    task = scheduler.schedule(lambda: calls.append(1), Schedule(PERIOD))
+    wait_for_calls(calls, 3)
+
+    release.set()
+    slow_task.cancel()
+    task.cancel()
+
+
+def test_schedule__callback_raises_exception(scheduler):
+    calls: list[int] = []
+
+    def callback():
+        calls.append(1)
+        raise Exception("failed")
+
+    task = scheduler.schedule(callback, Schedule(PERIOD))
+    wait_for_calls(calls, 2)
+    task.cancel()
+
+
+def test_cancel__no_more_calls(scheduler):
+    calls: list[int] = []
+
+    task = scheduler.schedule(lambda: calls.append(1), Schedule(PERIOD))
+    wait_for_calls(calls, 1)
+    assert task.cancel()
+    num_calls = len(calls)
+    time.sleep(3 * PERIOD)
+
+    assert task.cancelled
+    assert len(calls) == num_calls
+
+
+def test_cancel__waits_for_callback(scheduler):
+    started = Event()
+    completed = Event()
+
+    def callback():
+        started.set()
+        time.sleep(PERIOD)
+        completed.set()
+
+    task = scheduler.schedule(callback, Schedule(PERIOD))
+    assert started.wait(5)
+    assert task.cancel()
+
+    assert completed.is_set()
+
+
+def test_cancel__timeout(scheduler):
+    started = Event()
+    release = Event()
+
+    def callback():
+        started.set()
+        release.wait(5)
+
+    task = scheduler.schedule(callback, Schedule(PERIOD))
+    assert started.wait(5)
+
+    assert not task.cancel(timeout=0.01)
+    release.set()
+
+
+def test_cancel__from_callback(scheduler):
+    stopped = Event()
+
+    def callback():
+        caller.stop()
+        stopped.set()
+
+    caller = PeriodicCaller(callback, PERIOD, scheduler=scheduler)
+    caller.start()
+
+    assert stopped.wait(5)
+
+
+def scheduler_threads() -> list[threading.Thread]:
+    return [t for t in threading.enumerate() if t.name.startswith("TestScheduler")]
+
+
+def test_shutdown(scheduler):
+    calls: list[int] = []
+    tasks = [scheduler.schedule(lambda: calls.append(1), Schedule(PERIOD)) for _ in range(4)]
+    wait_for_calls(calls, 8)
+
+    scheduler.shutdown()
+    num_calls = len(calls)
+    time.sleep(3 * PERIOD)
+
+    assert len(calls) == num_calls
+    assert all(task.cancelled for task in tasks)
+    assert scheduler_threads() == []
+    with pytest.raises(RuntimeError):
+        scheduler.schedule(lambda: None, Schedule(PERIOD))
+
+
+def test_shutdown__waits_for_callback(scheduler):
+    started = Event()
+    completed = Event()
+
+    def callback():
+        started.set()
+        time.sleep(PERIOD)
+        completed.set()
+
+    scheduler.schedule(callback, Schedule(PERIOD))
+    assert started.wait(5)
+    scheduler.shutdown()
+
+    assert completed.is_set()
+
+
+@pytest.mark.parametrize("inline", [False, True])
+def test_shutdown__from_callback(scheduler, inline):
+    shut_down = Event()
+
+    def callback():
+        scheduler.shutdown()
+        shut_down.set()
+
+    scheduler.schedule(callback, Schedule(PERIOD), inline=inline)
+
+    assert shut_down.wait(5)
+    scheduler.shutdown()
+    assert scheduler_threads() == []
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires fork()")
+def test_fork__cancels_parent_tasks(scheduler):
+    started = Event()
+    release = Event()
+    calls: list[int] = []
+
+    def slow_callback():
+        started.set()
+        release.wait(5)
+
+    slow_task = scheduler.schedule(slow_callback, Schedule(PERIOD))
+    scheduler.schedule(lambda: calls.append(1), Schedule(PERIOD))
+    assert started.wait(5)
+
+    pid = os.fork()
+    if pid == 0:
+        # Child process: the parent's tasks are cancelled, but new tasks are called
+        exit_code = 1
+        try:
+            child_calls: list[int] = []
+            assert slow_task.cancel(timeout=1)
+            num_calls = len(calls)
+            scheduler.schedule(lambda: child_calls.append(1), Schedule(PERIOD))
+            wait_for_calls(child_calls, 2)
+            assert len(calls) == num_calls
+            scheduler.shutdown()
+            exit_code = 0
+        finally:
+            os._exit(exit_code)
+
+    release.set()
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+
+
+def test_periodic_caller__run_in_foreground():
+    calls: list[str] = []
+
+    def callback():
+        calls.append(threading.current_thread().name)
+        if len(calls) >= 2:
+            caller.stop()
+
+    caller = PeriodicCaller(callback, PERIOD)
+    caller.run()
+
+    assert set(calls) == {threading.current_thread().name}
+
+
+@pytest.mark.parametrize(
+    "fixed_rate, start_time, end_time, expected_missed_calls",
+    [
+        (False, 0, 0.5, 0),
+        (False, 0.5, 1.5, 1),
+        (False, 0.5, 3.6, 3),
+        (True, 0, 0.5, 0),
+        (True, 0.5, 1.2, 1),
+        (True, 0.5, 3.6, 3),
+    ],
+)
+def test_schedule__get_missed_calls(fixed_rate, start_time, end_time, expected_missed_calls):
+    schedule = Schedule(1, fixed_rate=fixed_rate)
+
+    assert schedule.get_missed_calls(0, start_time, end_time) == expected_missed_calls
+
+
+@pytest.mark.parametrize("overrun_policy", list(OverrunPolicy))
+def test_schedule__get_next_call_time__fixed_rate_zero_period(overrun_policy):
+    schedule = Schedule(0, fixed_rate=True, overrun_policy=overrun_policy)
+    scheduled_call_time = time.monotonic() - 1
+
+    assert schedule.get_next_call_time(scheduled_call_time) <= time.monotonic()
+
+
+def test_scheduled_task__stats(scheduler):
+    # The period leaves plenty of headroom so that a slow sleep doesn't overrun under load
+    task = scheduler.schedule(lambda: time.sleep(PERIOD / 2), Schedule(10 * PERIOD))
+    while task.stats().calls < 2:
+        time.sleep(0.001)
+    task.cancel()
+    stats = task.stats()
+
+    assert stats.mean_duration >= PERIOD / 2
+    assert stats.overruns == 0
+
+
+def test_schedule__get_backoff_delay():
+    schedule = Schedule(1, backoff=Backoff(max_delay=10, multiplier=3))
+
+    delays = [0.0]
+    for _ in range(4):
+        delays.append(schedule.get_backoff_delay(delays[-1]))
+
+    assert delays == [0, 3, 9, 10, 10]
+
+
+def test_async_periodic_caller__fixed_delay():
+    call_times: list[float] = []
+
+    async def callback():
+        call_times.append(time.monotonic())
+        await asyncio.sleep(PERIOD / 2)
+
+    async def run():
+        caller = AsyncPeriodicCaller(callback, PERIOD)
+        caller.start()
+        while len(call_times) < 3:
+            await asyncio.sleep(0.001)
+        await caller.stop()
+
+        return caller.stats()
+
+    stats = asyncio.run(run())
+
+    # Each wait starts after the previous call completes
+    assert call_times[2] - call_times[0] >= 2 * (PERIOD + PERIOD / 2)
+    assert stats.calls == 3
+
+
+def test_async_periodic_caller__run_in_foreground():
+    calls: list[int] = []
+
+    async def callback():
+        calls.append(1)
+        if len(calls) >= 2:
+            await caller.stop()
+
+    caller = AsyncPeriodicCaller(callback, PERIOD)
+    asyncio.run(caller.run())
+
+    assert len(calls) == 2
+
+
+def test_async_periodic_caller__stop_before_task_runs():
+    calls: list[int] = []
+
+    async def callback():
+        calls.append(1)
+
+    async def run():
+        caller = AsyncPeriodicCaller(callback, PERIOD)
+        async with asyncio.timeout(5):
+            caller.start()
+            await caller.stop()
+
+            run_task = asyncio.create_task(caller.run())
+            await caller.stop()
+            await run_task
+
+    asyncio.run(run())
+
+    assert calls == []
+
+
+def test_async_periodic_caller__trigger_after_loop_closed():
+    async def run():
+        async def callback():
+            pass
+
+        caller = AsyncPeriodicCaller(callback, PERIOD)
+        caller.start()
+        await asyncio.sleep(0)
+        await caller.stop()
+
+        return caller
+
+    caller = asyncio.run(run())
+
+    caller.trigger()
+
+
+def test_async_periodic_caller__callback_raises_exception():
+    calls: list[int] = []
+
+    async def callback():
+        calls.append(1)
+        raise Exception("failed")
+
+    async def run():
+        caller = AsyncPeriodicCaller(callback, PERIOD)
+        caller.start()
+        while len(calls) < 2:
+            await asyncio.sleep(0.001)
+        await caller.stop()
+
+    asyncio.run(run())
+
+
+def test_async_periodic_caller__stop_waits_for_call():
+    completed = asyncio.Event()
+
+    async def callback():
+        await asyncio.sleep(PERIOD)
+        completed.set()
+
+    async def run():
+        caller = AsyncPeriodicCaller(callback, PERIOD)
+        caller.start()
+        await asyncio.sleep(0)
+        await caller.stop()
+
+        assert completed.is_set()
+
+    asyncio.run(run())
+
+
+def test_async_periodic_caller__stop_timeout():
+    cancelled = Event()
+
+    async def callback():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run():
+        caller = AsyncPeriodicCaller(callback, PERIOD)
+        caller.start()
+        await asyncio.sleep(0)
+        await caller.stop(timeout=0.01)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert cancelled.is_set()
+
+
+def test_async_periodic_caller__stop_cancelled():
+    cancelled = Event()
+
+    async def callback():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run():
+        caller = AsyncPeriodicCaller(callback, PERIOD)
+        caller.start()
+        await asyncio.sleep(0)
+        stop_task = asyncio.create_task(caller.stop())
+        await asyncio.sleep(0.01)
+        stop_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await stop_task
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert cancelled.is_set()
+
+
+def test_async_periodic_caller__trigger():
+    calls: list[int] = []
+
+    async def run():
+        async def callback():
+            calls.append(1)
+
+        caller = AsyncPeriodicCaller(callback, 10)
+        caller.start()
+        while len(calls) < 1:
+            await asyncio.sleep(0.001)
+
+        # Trigger from another thread
+        threads = [threading.Thread(target=caller.trigger) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        while len(calls) < 2:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(PERIOD)
+        await caller.stop()
+
+    asyncio.run(run())
+
+    assert len(calls) == 2
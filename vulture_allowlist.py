@@ -1,54 +1,145 @@
 from monkeytoolbox import (
+    AsyncPeriodicCaller,
+    BatchedAppender,
+    Backoff,
+    CallbackStatus,
+    FileHashCache,
+    FileTooLargeError,
     InterruptableThreadMixin,
+    OverrunPolicy,
+    PeriodicCallStats,
     PeriodicCaller,
+    PeriodicScheduler,
+    RequestCacheInfo,
+    Schedule,
+    ScheduledTask,
+    SecureRandomStringGenerator,
+    SymlinkPolicy,
     ThreadSafeIterator,
+    append_binary_io,
     append_bytes,
     apply_filters,
+    apply_vectorized_filters,
     create_secure_directory,
     del_key,
+    drain_queue,
     expand_path,
     get_all_regular_files_in_directory,
+    copy_binary_io,
+    copy_binary_io_with_hashes,
+    get_binary_io_hashes,
     get_binary_io_sha256_hash,
+    get_default_scheduler,
+    get_file_sha256_hashes,
     get_hardware_id,
     get_hostname,
     get_my_ip_addresses,
     get_os_version,
     get_text_file_contents,
     insecure_generate_random_string,
+    insecure_generate_unique_random_strings,
     interruptible_function,
     interruptible_iter,
+    iter_queue_batches,
+    iter_text_file_chunks,
+    iter_text_file_lines,
     make_fileobj_copy,
+    make_spooled_fileobj_copy,
+    memory_map_file,
     open_new_securely_permissioned_file,
     port_is_used,
     queue_to_list,
     request_cache,
     run_worker_threads,
     secure_generate_random_string,
+    secure_generate_random_strings,
+    walk_regular_files,
 )
 
+AsyncPeriodicCaller
+AsyncPeriodicCaller.run
+AsyncPeriodicCaller.stop
+AsyncPeriodicCaller.trigger
+Backoff
+BatchedAppender
+BatchedAppender.append
+BatchedAppender.close
+CallbackStatus
+CallbackStatus.BUSY
+FileHashCache
+FileHashCache.prune
+FileHashCache.save
+FileTooLargeError
 InterruptableThreadMixin
+OverrunPolicy
+OverrunPolicy.CATCH_UP
 PeriodicCaller
 PeriodicCaller.stop
+PeriodicCaller.stats
+PeriodicCaller.trigger
+PeriodicCallStats
+PeriodicCallStats.calls
+PeriodicCallStats.overruns
+PeriodicCallStats.last_duration
+PeriodicCallStats.mean_duration
+PeriodicCallStats.max_duration
+PeriodicCallStats.last_lag
+PeriodicCallStats.max_lag
+PeriodicScheduler
+Schedule
+ScheduledTask
+ScheduledTask.cancel
+ScheduledTask.run
+RequestCacheInfo
+SecureRandomStringGenerator
+SecureRandomStringGenerator.generate_many
+SymlinkPolicy
+SymlinkPolicy.SKIP
+walk_regular_files
+RequestCacheInfo.hits
+RequestCacheInfo.misses
+RequestCacheInfo.refreshes
+RequestCacheInfo.errors
+RequestCacheInfo.currsize
+RequestCacheInfo.call_time
+RequestCacheInfo.lock_wait_time
 ThreadSafeIterator
+append_binary_io
 append_bytes
 apply_filters
+apply_vectorized_filters
 create_secure_directory
 del_key
+drain_queue
 expand_path
 get_all_regular_files_in_directory
+copy_binary_io
+copy_binary_io_with_hashes
+get_binary_io_hashes
 get_binary_io_sha256_hash
+get_default_scheduler
+get_file_sha256_hashes
 get_hardware_id
 get_hostname
 get_my_ip_addresses
 get_os_version
 get_text_file_contents
 insecure_generate_random_string
+insecure_generate_unique_random_strings
 interruptible_function
 interruptible_iter
+iter_queue_batches
+iter_text_file_chunks
+iter_text_file_lines
 make_fileobj_copy
+make_spooled_fileobj_copy
+memory_map_file
 open_new_securely_permissioned_file
 port_is_used
 queue_to_list
 request_cache
+request_cache.clear_cache
+request_cache.cache_info
 run_worker_threads
 secure_generate_random_string
+secure_generate_random_strings